@@ -0,0 +1,228 @@
+"""
+Benchmarks every route and ScheduleGenerator method against a recording of septa's servers
+
+Requests go through the whole app in process, and upstream requests are answered by
+`benchmarks.replay.ReplayTransport`. Each case runs `--requests` times spread over
+`--concurrency` concurrent callers after one warm-up pass. Results can be saved with
+`--output` and compared with an earlier run with `--compare`.
+
+Usage (from the `src` directory):
+    uv run python -m benchmarks.replay synthesize
+    uv run python -m benchmarks.bench_app --output before.json
+    uv run python -m benchmarks.bench_app --compare before.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import statistics
+import subprocess
+import time
+from collections.abc import Awaitable, Callable
+from datetime import date
+from pathlib import Path
+
+import httpx
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+
+import septum.upstream as upstream
+from benchmarks.replay import DEFAULT_RECORDING, ReplayTransport
+from septum.cache import TTLCache
+from septum.enums import Direction
+from septum.main import app, results
+from septum.models import schedule
+
+Case = Callable[[int], Awaitable[object]]
+
+
+async def measure(case: Case, requests: int, concurrency: int) -> dict[str, float]:
+    """
+    Calls `case` with 0..`requests` - 1 from `concurrency` callers, after a warm-up pass
+    """
+    for n in range(concurrency):
+        await case(n)
+
+    counter = itertools.count()
+    latencies = []
+
+    async def caller():
+        while (n := next(counter)) < requests:
+            start = time.perf_counter()
+            await case(n)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    cuts = statistics.quantiles(latencies, n=100)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": cuts[49] * 1000,
+        "p95_ms": cuts[94] * 1000,
+        "p99_ms": cuts[98] * 1000,
+        "throughput_rps": requests / elapsed,
+    }
+
+
+async def build_cases(client: httpx.AsyncClient) -> dict[str, Case]:
+    """
+    Builds a case per route and generator method, cycling through every line and direction
+    """
+    trips = []
+    for line in schedule.LINES:
+        for direction in Direction:
+            index = await schedule.get_station_index(line["line_code"], direction)
+            names = [stop.stop_name for stop in index.stations]
+            if len(names) > 1:
+                trips.append((line["line_code"], direction, names[0], names[-1]))
+
+    def trip(n: int) -> tuple[str, Direction, str, str]:
+        return trips[n % len(trips)]
+
+    def params(n: int, keys: tuple[str, ...], **extra: str) -> dict[str, str]:
+        line, direction, orig, dest = trip(n)
+        values = {"line": line, "direction": direction.value, "orig": orig, "dest": dest}
+        return {key: values[key] for key in keys} | extra
+
+    async def get(url: str, query: dict[str, str] | None = None):
+        response = await client.get(url, params=query)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} {query} returned {response.status_code}: {response.text}")
+        return response.content
+
+    async def consume(n: int):
+        line, direction, _, _ = trip(n)
+        return [item async for item in await schedule.get_schedules_for_stations(line, direction)]
+
+    day = date(2024, 8, 26)
+    return {
+        "GET /api/stations": lambda n: get("/api/stations"),
+        "GET /api/routes/bus": lambda n: get("/api/routes/bus"),
+        "GET /api/routes/trolley": lambda n: get("/api/routes/trolley"),
+        "GET /api/schedule/lines": lambda n: get("/api/schedule/lines"),
+        "GET /api/schedule/stations": lambda n: get(
+            "/api/schedule/stations", params(n, keys=("line", "direction"))
+        ),
+        "GET /api/schedule (orig)": lambda n: get(
+            "/api/schedule", params(n, keys=("line", "direction", "orig"))
+        ),
+        "GET /api/schedule (orig, dest)": lambda n: get(
+            "/api/schedule", params(n, keys=("line", "direction", "orig", "dest"))
+        ),
+        "GET /api/schedule/next": lambda n: get(
+            "/api/schedule/next",
+            params(n, keys=("line", "direction", "orig", "dest"), after="08:00", day=str(day)),
+        ),
+        "GET /api/schedule/line": lambda n: get(
+            "/api/schedule/line", params(n, keys=("line", "direction"))
+        ),
+        "get_stations_for_line": lambda n: schedule.get_stations_for_line(*trip(n)[:2]),
+        "get_schedule_for_station": lambda n: schedule.get_schedule_for_station(
+            trip(n)[0], trip(n)[2], trip(n)[1]
+        ),
+        "get_schedule_for_line": lambda n: schedule.get_schedule_for_line(
+            trip(n)[0], trip(n)[2], trip(n)[3], trip(n)[1]
+        ),
+        "get_next_departures": lambda n: schedule.get_next_departures(
+            trip(n)[0], trip(n)[2], trip(n)[3], trip(n)[1], day, "08:00:00", 5
+        ),
+        "get_schedules_for_stations": consume,
+    }
+
+
+def metadata(args: argparse.Namespace) -> dict[str, object]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "recording": str(args.recording),
+        "delay": args.delay,
+        "result_cache": not args.no_result_cache,
+    }
+
+
+def compare(baseline: dict, timings: dict):
+    print(f"{'case':<32} {'p50 before':>11} {'p50 after':>10} {'change':>8} {'rps change':>11}")
+    for name, after in timings["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:<32} {'-':>11} {after['p50_ms']:>10.3f}")
+            continue
+        latency = (after["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100
+        throughput = (
+            (after["throughput_rps"] - before["throughput_rps"]) / before["throughput_rps"] * 100
+        )
+        print(
+            f"{name:<32} {before['p50_ms']:>11.3f} {after['p50_ms']:>10.3f}"
+            f" {latency:>+7.1f}% {throughput:>+10.1f}%"
+        )
+
+
+async def run(args: argparse.Namespace) -> dict:
+    upstream.install_client(
+        upstream.UpstreamClient(transport=ReplayTransport(args.recording, delay=args.delay))
+    )
+    FastAPICache.init(InMemoryBackend(), prefix="bench")
+    if args.no_result_cache:
+        # Entries expire right away, so every request goes through the generator
+        results.local = TTLCache(ttl=0, maxsize=1)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        cases = await build_cases(client)
+        timings = {}
+        for name, case in cases.items():
+            if args.only and not any(part in name for part in args.only):
+                continue
+            timings[name] = await measure(case, args.requests, args.concurrency)
+            print(
+                f"{name:<32} p50 {timings[name]['p50_ms']:>8.3f} ms"
+                f"  p99 {timings[name]['p99_ms']:>8.3f} ms"
+                f"  {timings[name]['throughput_rps']:>9.1f} req/s"
+            )
+
+    await upstream.close_client()
+    return {"meta": metadata(args), "results": timings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--recording", type=Path, default=DEFAULT_RECORDING)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--delay", type=float, default=0.0, help="Seconds each upstream response takes"
+    )
+    parser.add_argument(
+        "--no-result-cache",
+        action="store_true",
+        help="Don't keep serialized responses, so routes go through the generator every time",
+    )
+    parser.add_argument("--only", nargs="*", help="Only run cases with one of these in their name")
+    parser.add_argument("--output", type=Path, help="Save the results as JSON")
+    parser.add_argument("--compare", type=Path, help="Compare with results saved by --output")
+    args = parser.parse_args()
+
+    if not (args.recording / "manifest.json").exists():
+        parser.error(f"No recording in {args.recording}, see `python -m benchmarks.replay`")
+
+    timings = asyncio.run(run(args))
+    if args.output:
+        args.output.write_text(json.dumps(timings, indent=2))
+    if args.compare:
+        compare(json.loads(args.compare.read_text()), timings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmarks how responsive the app stays while schedules are being built, per EXECUTOR_MODE
+
+For `--duration` seconds, `--heavy` callers keep refetching two large stop schedules and joining
+them into trips, while one caller keeps requesting `/api/schedule/lines`, which does no work of
+its own. How long those light requests take shows how long the event loop was held up.
+
+Usage (from the `src` directory):
+    uv run python -m benchmarks.bench_executor [--modes inline thread process] [--trains 400]
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+import septum.executor as executor
+import septum.upstream as upstream
+from benchmarks.fixtures import make_schedule
+from septum.enums import Direction
+from septum.main import app
+from septum.schedules import ScheduleGenerator
+
+LINE = "PAO"
+STOPS = [
+    {"stop_id": 90004, "stop_name": "Paoli", "direction_id": 0},
+    {"stop_id": 90005, "stop_name": "Malvern", "direction_id": 0},
+]
+
+
+def septa(trains: int) -> httpx.MockTransport:
+    stops = json.dumps(STOPS).encode()
+    schedules = {
+        str(stop["stop_id"]): json.dumps(
+            make_schedule(trains, seed=stop["stop_id"], stop_id=stop["stop_id"], offset=position)
+        ).encode()
+        for position, stop in enumerate(STOPS)
+    }
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("stops.json"):
+            return httpx.Response(200, content=stops)
+        return httpx.Response(200, content=schedules[request.url.path.split("/")[-2]])
+
+    return httpx.MockTransport(handle)
+
+
+async def run(mode: str, args: argparse.Namespace) -> dict[str, float]:
+    executor.configure(mode, args.workers)
+    upstream.install_client(upstream.UpstreamClient(transport=septa(args.trains)))
+    schedule = ScheduleGenerator()
+    # Start the pool, and the processes in it, before timing anything
+    await schedule.refresh_schedule(LINE, "90004")
+
+    deadline = time.perf_counter() + args.duration
+    heavy_done = 0
+    latencies = []
+
+    async def heavy():
+        nonlocal heavy_done
+        while time.perf_counter() < deadline:
+            await schedule.refresh_schedule(LINE, "90004")
+            await schedule.refresh_schedule(LINE, "90005")
+            await schedule.get_schedule_for_line(LINE, "Paoli", "Malvern", Direction.INBOUND)
+            heavy_done += 1
+
+    async def light(client: httpx.AsyncClient):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.get("/api/schedule/lines")
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+            await asyncio.sleep(0.005)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await asyncio.gather(light(client), *(heavy() for _ in range(args.heavy)))
+
+    await upstream.close_client()
+    executor.shutdown()
+    # Inclusive, since a blocked loop may only let a handful of light requests through
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "p50_ms": cuts[49] * 1000,
+        "p95_ms": cuts[94] * 1000,
+        "p99_ms": cuts[98] * 1000,
+        "max_ms": max(latencies) * 1000,
+        "heavy_per_s": heavy_done / args.duration,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--modes", nargs="*", default=list(executor.MODES))
+    parser.add_argument("--workers", type=int, default=executor.EXECUTOR_WORKERS)
+    parser.add_argument("--trains", type=int, default=400, help="Trains per direction and service")
+    parser.add_argument("--heavy", type=int, default=4, help="Callers building schedules")
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(
+        f"{'mode':<8} {'light p50':>10} {'p95':>8} {'p99':>8} {'max (ms)':>9}"
+        f" {'heavy ops/s':>12}"
+    )
+    for mode in args.modes:
+        result = asyncio.run(run(mode, args))
+        print(
+            f"{mode:<8} {result['p50_ms']:>10.2f} {result['p95_ms']:>8.2f}"
+            f" {result['p99_ms']:>8.2f} {result['max_ms']:>9.2f} {result['heavy_per_s']:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmarks the processing done on a stop's schedule.json
+
+Usage:
+    uv run python -m benchmarks.bench_schedules (from the `src` directory)
+"""
+
+import timeit
+import tracemalloc
+
+from benchmarks.fixtures import WEEKDAY_SID, WEEKEND_SID, make_schedule
+from septum.records import Departure
+from septum.schedules import ScheduleColumns
+
+SERVICE_IDS = ([WEEKDAY_SID], [WEEKEND_SID])
+
+
+def legacy_most_recent(raw_schedule: list[dict], direction_int: int) -> list[list[dict]]:
+    # The per-block rescan `get_schedule_for_station` used before ScheduleColumns
+    sorted_trains = []
+    for service_id in SERVICE_IDS:
+        trains = [
+            train
+            for train in raw_schedule
+            if (train["service_id"] in service_id and train["direction_id"] == direction_int)
+        ]
+        train_ids = set(train["block_id"] for train in trains)
+
+        most_recent = []
+        for train_id in train_ids:
+            same_train_id = [train for train in trains if train["block_id"] == train_id]
+            most_recent.append(max(same_train_id, key=lambda x: x["release_name"]))
+
+        most_recent = [
+            {"train_id": str(train["block_id"]), "departure_time": train["arrival_time"]}
+            for train in most_recent
+        ]
+        sorted_trains.append(sorted(most_recent, key=lambda x: x["departure_time"]))
+    return sorted_trains
+
+
+def columnar_most_recent(raw_schedule: list[dict], direction_int: int) -> list[list[Departure]]:
+    columns = ScheduleColumns(raw_schedule)
+    return [columns.most_recent(service_id, direction_int) for service_id in SERVICE_IDS]
+
+
+def allocated(build) -> float:
+    """
+    KiB still allocated for what `build` returns
+    """
+    tracemalloc.start()
+    kept = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return size / 1024
+
+
+def main():
+    print(
+        f"{'trains':>8} {'rows':>8} {'legacy (ms)':>12} {'columnar (ms)':>14} {'speedup':>8}"
+        f" {'dicts (KiB)':>12} {'records (KiB)':>14}"
+    )
+    for trains in (25, 100, 250, 500):
+        raw_schedule = make_schedule(trains)
+        assert [[t["train_id"] for t in s] for s in legacy_most_recent(raw_schedule, 0)] == [
+            [t.train_id for t in s] for s in columnar_most_recent(raw_schedule, 0)
+        ]
+
+        number = max(1, 2000 // trains)
+        legacy = min(
+            timeit.repeat(lambda: legacy_most_recent(raw_schedule, 0), number=number, repeat=5)
+        )
+        columnar = min(
+            timeit.repeat(lambda: columnar_most_recent(raw_schedule, 0), number=number, repeat=5)
+        )
+        # What a stop's processed trains take up, the way they were kept before and now
+        dicts = allocated(lambda: legacy_most_recent(raw_schedule, 0))
+        columns = ScheduleColumns(raw_schedule)
+        records = allocated(lambda: [columns.most_recent(sid, 0) for sid in SERVICE_IDS])
+        print(
+            f"{trains:>8} {len(raw_schedule):>8} {legacy / number * 1000:>12.2f}"
+            f" {columnar / number * 1000:>14.2f} {legacy / columnar:>7.1f}x"
+            f" {dicts:>12.1f} {records:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Benchmarks the HTML parser backends in septum.tables on septa-shaped pages
+
+Usage:
+    uv run python -m benchmarks.bench_scrapers (from the `src` directory)
+"""
+
+import timeit
+
+from benchmarks.fixtures import make_bus_and_trolley_page, make_station_names_page
+from septum.tables import BACKENDS, get_backend
+
+PAGES = {
+    "stations": make_station_names_page(),
+    "bus/trolley": make_bus_and_trolley_page(),
+    "bus/trolley x10": make_bus_and_trolley_page(bus_routes=1300, trolley_routes=80),
+}
+
+
+def available_backends() -> dict:
+    backends = {}
+    for name in BACKENDS:
+        try:
+            backends[name] = get_backend(name)
+        except ImportError:
+            print(f"skipping {name}, its parser is not installed")
+    return backends
+
+
+def main():
+    backends = available_backends()
+    print(f"{'page':>16} {'bytes':>8}" + "".join(f" {name + ' (ms)':>17}" for name in backends))
+
+    for page_name, content in PAGES.items():
+        expected = backends["soup"](content)
+        timings = []
+        for name, backend in backends.items():
+            assert backend(content) == expected, f"{name} disagrees with soup on {page_name}"
+            number = 20
+            timings.append(min(timeit.repeat(lambda: backend(content), number=number, repeat=5)))
+        print(
+            f"{page_name:>16} {len(content):>8}"
+            + "".join(f" {timing / number * 1000:>17.2f}" for timing in timings)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmarks turning a schedule result into the JSON response body
+
+Usage:
+    uv run python -m benchmarks.bench_serialization (from the `src` directory)
+"""
+
+import json
+import timeit
+
+from pydantic import TypeAdapter
+
+from benchmarks.fixtures import WEEKDAY_SID, WEEKEND_SID, make_schedule
+from septum.models import ScheduleMainOutput
+from septum.results import ResultCache
+from septum.schedules import ScheduleColumns, ScheduleGenerator
+
+ADAPTER = TypeAdapter(ScheduleMainOutput)
+
+
+def make_result(trains: int, with_dest: bool) -> dict[str, list[dict[str, str]]]:
+    columns = ScheduleColumns(make_schedule(trains))
+    result = ScheduleGenerator._as_output(
+        columns.most_recent([WEEKDAY_SID], 0), columns.most_recent([WEEKEND_SID], 0)
+    )
+    if with_dest:
+        # Shaped like `get_schedule_for_line`'s output, the arrival time doesn't matter here
+        result = {
+            service: [
+                {
+                    "departure_time": train["departure_time"],
+                    "arrival_time": train["departure_time"],
+                    "train_id": train["train_id"],
+                }
+                for train in trains
+            ]
+            for service, trains in result.items()
+        }
+    return result
+
+
+def fastapi_encode(result) -> bytes:
+    # What FastAPI does with a `response_model` and a plain JSONResponse
+    value = ADAPTER.validate_python(result)
+    return json.dumps(ADAPTER.dump_python(value, mode="json")).encode()
+
+
+def main():
+    validated = ResultCache(validate=True)
+    trusted = ResultCache(validate=False)
+
+    print(
+        f"{'trains':>8} {'dest':>6} {'fastapi (us)':>13} {'validated (us)':>15}"
+        f" {'trusted (us)':>13} {'speedup':>8}"
+    )
+    for trains in (25, 100, 250):
+        for with_dest in (False, True):
+            result = make_result(trains, with_dest)
+            body = trusted.serialize(ScheduleMainOutput, result)
+            assert body == validated.serialize(ScheduleMainOutput, result)
+            assert json.loads(body) == json.loads(fastapi_encode(result))
+
+            number = max(10, 20000 // trains)
+            timings = [
+                min(timeit.repeat(encode, number=number, repeat=5)) / number * 1e6
+                for encode in (
+                    lambda: fastapi_encode(result),
+                    lambda: validated.serialize(ScheduleMainOutput, result),
+                    lambda: trusted.serialize(ScheduleMainOutput, result),
+                )
+            ]
+            print(
+                f"{trains:>8} {str(with_dest):>6} {timings[0]:>13.1f} {timings[1]:>15.1f}"
+                f" {timings[2]:>13.1f} {timings[0] / timings[2]:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
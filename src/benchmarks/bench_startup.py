@@ -0,0 +1,117 @@
+"""
+Measures how long a fresh process takes to import the app and to serve its first request
+
+Each run starts a new interpreter, so nothing is shared between runs:
+    python: Starting python and exiting.
+    import: Starting python and importing `septum.main`.
+    first request: Starting uvicorn until `/api/schedule/lines` answers, which needs neither Redis
+        nor septa's servers. The warm-up is turned off so it doesn't compete with the request.
+
+Usage (from the `src` directory):
+    uv run python -m benchmarks.bench_startup [--runs 10] [--imports 15]
+"""
+
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+SRC = Path(__file__).parents[1]
+ENV = {**os.environ, "WARMUP_ENABLED": "false"}
+
+
+def timed(command: list[str]) -> float:
+    start = time.perf_counter()
+    subprocess.run(command, cwd=SRC, env=ENV, check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def first_request() -> float:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/api/schedule/lines"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "septum.main:app", "--port", str(port)],
+        cwd=SRC,
+        env=ENV,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            try:
+                if httpx.get(url, timeout=1).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.TransportError:
+                pass
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn exited before serving a request")
+            time.sleep(0.005)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def slowest_imports(count: int) -> list[tuple[float, str]]:
+    """
+    The `count` slowest top-level imports of `septum.main`, including what they import
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import septum.main"],
+        cwd=SRC,
+        env=ENV,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+    imports, children = [], []
+    for line in stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)", line)
+        if match is None:
+            continue
+        # A module is listed after everything it imports, indented one level deeper than it
+        if not match[2]:
+            if match[3] == "septum.main":
+                imports = children
+            children = []
+        elif len(match[2]) == 2:
+            children.append((int(match[1]) / 1000, match[3]))
+    return sorted(imports, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--imports", type=int, default=15, help="How many slow imports to list")
+    args = parser.parse_args()
+
+    cases = {
+        "python": lambda: timed([sys.executable, "-c", "pass"]),
+        "import": lambda: timed([sys.executable, "-c", "import septum.main"]),
+        "first request": first_request,
+    }
+    print(f"{'':<16} {'median (ms)':>12} {'min (ms)':>10}")
+    for name, case in cases.items():
+        timings = [case() * 1000 for _ in range(args.runs)]
+        print(f"{name:<16} {statistics.median(timings):>12.1f} {min(timings):>10.1f}")
+
+    print(f"\nSlowest imports of septum.main ({'ms':>4})")
+    for milliseconds, module in slowest_imports(args.imports):
+        print(f"{module:<40} {milliseconds:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Synthetic upstream payloads shaped like septa's flat-api responses
+"""
+
+import random
+
+WEEKDAY_SID = "SID185189"
+WEEKEND_SID = "SID185186"
+
+
+def make_schedule(
+    trains: int,
+    releases: int = 3,
+    stale_service_ids: int = 4,
+    seed: int = 0,
+    line: str = "PAO",
+    stop_id: int = 90005,
+    offset: int = 0,
+) -> list[dict]:
+    """
+    Builds a schedule.json payload for a single stop.
+
+    Args:
+        trains (int): Distinct block IDs per direction for weekday service and the retired
+            service IDs, weekend service runs half as many.
+        releases (int): How many `release_name`s each train shows up under.
+        stale_service_ids (int): Extra service IDs that should be filtered out.
+        seed (int): Seed for the shuffle, so runs are comparable.
+        line (str): The line the stop is on.
+        stop_id (int): The stop's ID.
+        offset (int): Minutes added to every time, so stops further down the line are later.
+
+    Returns:
+        list[dict]: Rows in the same shape as schedule.json.
+    """
+    rnd = random.Random(seed)
+    service_ids = [WEEKDAY_SID, WEEKEND_SID] + [f"SID1{n:05d}" for n in range(stale_service_ids)]
+    rows = []
+
+    for direction_id in (0, 1):
+        for service_number, service_id in enumerate(service_ids):
+            service_trains = trains // 2 if service_id == WEEKEND_SID else trains
+            for train in range(service_trains):
+                block_id = direction_id * 100000 + service_number * 10000 + train
+                # Retired service IDs only show up under older releases
+                year = 2024 if service_number < 2 else 2023
+                for release in range(releases):
+                    minutes = 240 + (train * 1200 // service_trains) + release + offset
+                    rows.append(
+                        {
+                            "trip_id": f"{block_id}_{release}",
+                            "route_id": line,
+                            "stop_id": stop_id,
+                            "block_id": block_id,
+                            "service_id": service_id,
+                            "direction_id": direction_id,
+                            "release_name": f"{year}{release + 1:02d}01",
+                            "arrival_time": f"{minutes // 60:02d}:{minutes % 60:02d}:00",
+                            "departure_time": f"{minutes // 60:02d}:{minutes % 60:02d}:00",
+                            "stop_sequence": 5,
+                        }
+                    )
+
+    rnd.shuffle(rows)
+    return rows
+
+
+def _page(title: str, tables: list[list[tuple[str, str]]], header: tuple[str, str]) -> bytes:
+    parts = [
+        "<!DOCTYPE HTML PUBLIC '-//W3C//DTD HTML 4.01 Transitional//EN'>",
+        f"<html><head><title>{title}</title>",
+        "<style>td { font-family: Arial; }</style></head><body>",
+        f"<h1>{title}</h1><!-- generated by septa -->",
+    ]
+    for rows in tables:
+        parts.append('<table border="1" cellpadding="2" width="100%">')
+        parts.append(f"<tr><th><b>{header[0]}</b></th><th><b>{header[1]}</b></th></tr>")
+        for first, second in rows:
+            parts.append(
+                f'<tr>\n  <td align="center"><font size="2"> {first} </font></td>\n'
+                f'  <td><font size="2"><a href="#">{second}</a>&nbsp;</font></td>\n</tr>'
+            )
+        parts.append("</table><br>")
+    parts.append("</body></html>")
+    return "\n".join(parts).encode()
+
+
+def make_station_names_page(stations: int = 160) -> bytes:
+    """
+    Builds a page shaped like VIRegionalRail.html, with the stations split over 13 tables.
+    """
+    rows = [(f"Station {n} &amp; Yard", f"Station {n}") for n in range(stations)]
+    rows[7] = ("Wayne", "Wayne")
+    per_table = -(-stations // 13)
+    tables = [rows[start : start + per_table] for start in range(0, stations, per_table)]
+    return _page("Regional Rail Inputs", tables, ("Station Name", "Parameter"))
+
+
+def make_bus_and_trolley_page(bus_routes: int = 130, trolley_routes: int = 8) -> bytes:
+    """
+    Builds a page shaped like VIBusAndTrolley.html, with the trolleys in the last table.
+    """
+    buses = [(str(n), f"Route {n} to Center City") for n in range(1, bus_routes + 1)]
+    trolleys = [(str(n), f"Trolley {n}") for n in range(10, 10 + trolley_routes)]
+    tables = [buses[start : start + 40] for start in range(0, bus_routes, 40)] + [trolleys]
+    return _page("Bus and Trolley Inputs", tables, ("Route", "Name"))
@@ -0,0 +1,168 @@
+"""
+Records septa's responses to disk and replays them in place of the real servers
+
+A recording is a directory with a `manifest.json` mapping each URL to the file holding its body,
+along with its status and caching headers. Recordings are not checked in, make one with:
+
+    uv run python -m benchmarks.replay record [directory]      (from live septa servers)
+    uv run python -m benchmarks.replay synthesize [directory]  (from benchmarks.fixtures, offline)
+
+The default directory is `benchmarks/recordings/latest`.
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import httpx
+
+import septum.upstream as upstream
+from benchmarks.fixtures import make_bus_and_trolley_page, make_schedule, make_station_names_page
+from septum.scrapers import BUS_AND_TROLLEY_ROUTES_URL, STATION_NAMES_URL
+from septum.schedules import ScheduleGenerator
+
+DEFAULT_RECORDING = Path(__file__).parent / "recordings" / "latest"
+MANIFEST = "manifest.json"
+# Response headers worth keeping, the rest don't change how septum handles a response
+KEPT_HEADERS = ("content-type", "etag", "last-modified")
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    An httpx transport that answers from a recording instead of the network.
+
+    Conditional requests are answered with a 304 when the recorded ETag or Last-Modified matches,
+    and URLs that weren't recorded get a 404. Every response can be held back by `delay` seconds
+    to stand in for the round trip to septa.
+    """
+
+    def __init__(self, directory: Path = DEFAULT_RECORDING, delay: float = 0.0):
+        self.directory = Path(directory)
+        self.delay = delay
+        manifest = json.loads((self.directory / MANIFEST).read_text())
+        # Bodies are read up front so disk reads don't show up in the timings
+        self.responses = {
+            url: (entry["status"], entry["headers"], (self.directory / entry["file"]).read_bytes())
+            for url, entry in manifest.items()
+        }
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+
+        recorded = self.responses.get(str(request.url))
+        if recorded is None:
+            return httpx.Response(404, request=request)
+
+        status, headers, body = recorded
+        etag = headers.get("etag")
+        last_modified = headers.get("last-modified")
+        if (etag is not None and request.headers.get("If-None-Match") == etag) or (
+            last_modified is not None and request.headers.get("If-Modified-Since") == last_modified
+        ):
+            return httpx.Response(304, headers=headers, request=request)
+        return httpx.Response(status, headers=headers, content=body, request=request)
+
+
+def _file_for(url: str) -> str:
+    # e.g. flat-api.septa.org/stops/TRE/stops.json
+    parsed = httpx.URL(url)
+    return f"{parsed.host}{parsed.path}"
+
+
+def save(directory: Path, responses: dict[str, tuple[int, dict[str, str], bytes]]):
+    """
+    Writes `responses`, keyed by URL, as a recording in `directory`
+    """
+    manifest = {}
+    for url, (status, headers, body) in responses.items():
+        file = _file_for(url)
+        (directory / file).parent.mkdir(parents=True, exist_ok=True)
+        (directory / file).write_bytes(body)
+        manifest[url] = {"status": status, "headers": headers, "file": file}
+    (directory / MANIFEST).write_text(json.dumps(manifest, indent=2, sort_keys=True))
+
+
+async def record(directory: Path = DEFAULT_RECORDING):
+    """
+    Fetches every page, stop list and stop schedule septum uses from septa and saves them
+    """
+    responses = {}
+
+    async def fetch(url: str) -> httpx.Response:
+        response = await upstream.get(url)
+        headers = {key: response.headers[key] for key in KEPT_HEADERS if key in response.headers}
+        responses[url] = (response.status_code, headers, response.content)
+        return response
+
+    lines = [line["line_code"] for line in ScheduleGenerator.LINES]
+    stop_lists = await asyncio.gather(
+        fetch(STATION_NAMES_URL),
+        fetch(BUS_AND_TROLLEY_ROUTES_URL),
+        *(fetch(ScheduleGenerator.STOPS_URL.format(line)) for line in lines),
+    )
+    stops = {
+        (line, stop["stop_id"])
+        for line, stop_list in zip(lines, stop_lists[2:])
+        for stop in stop_list.json()
+    }
+    await asyncio.gather(
+        *(fetch(ScheduleGenerator.SCHEDULE_URL.format(line, stop_id)) for line, stop_id in stops)
+    )
+    await upstream.close_client()
+    save(directory, responses)
+
+
+def synthesize(directory: Path = DEFAULT_RECORDING, stations: int = 15, trains: int = 40):
+    """
+    Builds a recording shaped like septa's responses from `benchmarks.fixtures`
+
+    Every line gets `stations` stops, and every stop `trains` trains per direction and service.
+    """
+    headers = {"content-type": "application/json"}
+    responses = {}
+    for number, line in enumerate(ScheduleGenerator.LINES):
+        line = line["line_code"]
+        stop_ids = [90000 + number * 100 + stop for stop in range(stations)]
+        stop_list = [
+            {"stop_id": stop_id, "stop_name": f"{line} Station {position}", "direction_id": 0}
+            for position, stop_id in enumerate(stop_ids)
+        ]
+        stop_list += [{**stop, "direction_id": 1} for stop in reversed(stop_list)]
+        responses[ScheduleGenerator.STOPS_URL.format(line)] = (
+            200,
+            headers,
+            json.dumps(stop_list).encode(),
+        )
+        for position, stop_id in enumerate(stop_ids):
+            schedule = make_schedule(
+                trains, seed=stop_id, line=line, stop_id=stop_id, offset=position * 4
+            )
+            responses[ScheduleGenerator.SCHEDULE_URL.format(line, stop_id)] = (
+                200,
+                headers,
+                json.dumps(schedule).encode(),
+            )
+
+    html = {"content-type": "text/html", "etag": '"bench"'}
+    responses[STATION_NAMES_URL] = (200, html, make_station_names_page())
+    responses[BUS_AND_TROLLEY_ROUTES_URL] = (200, html, make_bus_and_trolley_page())
+    save(directory, responses)
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ("record", "synthesize"):
+        sys.exit("Usage: python -m benchmarks.replay record|synthesize [directory]")
+
+    directory = Path(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_RECORDING
+    directory.mkdir(parents=True, exist_ok=True)
+    if sys.argv[1] == "record":
+        asyncio.run(record(directory))
+    else:
+        synthesize(directory)
+    print(f"Saved {len(json.loads((directory / MANIFEST).read_text()))} responses to {directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+The cache backend for the `@cache` decorated endpoints.
+
+Values are kept in Redis, so every replica sees the same ones, with a small in-process LRU in
+front of it. An entry is only served from the LRU for CACHE_LOCAL_TTL seconds, so replicas can
+only disagree for that long after something changes in Redis.
+"""
+
+import logging
+import os
+import time
+import zlib
+
+from fastapi_cache.types import Backend
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+import septum.metrics as metrics
+from septum.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 32))
+# Seconds to wait for a free connection once all of them are in use, or for Redis to answer
+REDIS_TIMEOUT = float(os.getenv("REDIS_TIMEOUT", 2))
+CACHE_LOCAL_TTL = int(os.getenv("CACHE_LOCAL_TTL", 30))
+CACHE_LOCAL_MAXSIZE = int(os.getenv("CACHE_LOCAL_MAXSIZE", 256))
+CACHE_COMPRESSION = os.getenv("CACHE_COMPRESSION", "true").lower() in ("1", "true", "yes")
+# Values smaller than this are stored as they are, compressing them isn't worth it
+CACHE_COMPRESS_MIN_SIZE = int(os.getenv("CACHE_COMPRESS_MIN_SIZE", 1024))
+
+# Marks compressed values, JSON never starts with a NUL byte
+COMPRESSED = b"\x00z"
+
+
+def connect(url: str) -> aioredis.Redis:
+    """
+    Creates a Redis client backed by a bounded connection pool
+
+    Once REDIS_MAX_CONNECTIONS connections are in use, callers wait up to REDIS_TIMEOUT seconds
+    for one to be handed back instead of opening another.
+    """
+    pool = aioredis.BlockingConnectionPool.from_url(
+        url,
+        max_connections=REDIS_MAX_CONNECTIONS,
+        timeout=REDIS_TIMEOUT,
+        socket_timeout=REDIS_TIMEOUT,
+        socket_connect_timeout=REDIS_TIMEOUT,
+    )
+    return aioredis.Redis(connection_pool=pool)
+
+
+def compress(value: bytes) -> bytes:
+    if not CACHE_COMPRESSION or len(value) < CACHE_COMPRESS_MIN_SIZE:
+        return value
+    return COMPRESSED + zlib.compress(value)
+
+
+def decompress(value: bytes | None) -> bytes | None:
+    """
+    Undoes `compress`, values stored without compression are returned as they are
+    """
+    if value is None or not value.startswith(COMPRESSED):
+        return value
+    return zlib.decompress(value[len(COMPRESSED) :])
+
+
+class TieredBackend(Backend):
+    """
+    A fastapi-cache backend that keeps recently used values in memory in front of Redis.
+
+    Values are compressed before they go to Redis and kept uncompressed in memory. A local entry
+    never outlives the Redis one it was read from, so the TTL handed back to fastapi-cache (and
+    used for Cache-Control) stays accurate. Concurrent local misses for the same key share one
+    round trip to Redis. If Redis can't be reached, lookups miss and stores only go to memory.
+    """
+
+    def __init__(
+        self,
+        redis: aioredis.Redis,
+        local_ttl: int = CACHE_LOCAL_TTL,
+        local_maxsize: int = CACHE_LOCAL_MAXSIZE,
+    ):
+        self.redis = redis
+        # Values are (when the entry expires in Redis, value)
+        self.local: TTLCache[tuple[float, bytes]] = TTLCache(ttl=local_ttl, maxsize=local_maxsize)
+
+    @staticmethod
+    def _expires_at(ttl: int) -> float:
+        # Redis reports a negative TTL for keys that don't expire
+        return time.monotonic() + ttl if ttl >= 0 else float("inf")
+
+    async def _fetch(self, key: str) -> tuple[float, bytes | None]:
+        try:
+            with metrics.phase("redis"):
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    ttl, value = await pipe.ttl(key).get(key).execute()
+        except (RedisError, OSError) as err:
+            logger.warning("Cache lookup for %s failed: %r", key, err)
+            return 0, None
+        return self._expires_at(ttl), decompress(value)
+
+    async def get_with_ttl(self, key: str) -> tuple[int, bytes | None]:
+        expires_at, value = await self.local.get_or_fetch(
+            key, lambda: self._fetch(key), should_store=lambda entry: entry[1] is not None
+        )
+        if value is None:
+            return 0, None
+
+        remaining = expires_at - time.monotonic()
+        if remaining <= 0:
+            self.local.invalidate(key)
+            return 0, None
+        return (int(remaining) if remaining != float("inf") else -1), value
+
+    async def get(self, key: str) -> bytes | None:
+        return (await self.get_with_ttl(key))[1]
+
+    async def set(self, key: str, value: bytes, expire: int | None = None):
+        self.local.set(key, (self._expires_at(expire if expire is not None else -1), value))
+        try:
+            with metrics.phase("redis"):
+                await self.redis.set(key, compress(value), ex=expire)
+        except (RedisError, OSError) as err:
+            logger.warning("Cache store for %s failed: %r", key, err)
+
+    async def clear(self, namespace: str | None = None, key: str | None = None) -> int:
+        """
+        Drops every value in `namespace`, or just `key`, from memory and from Redis
+
+        Other workers keep serving what they have in memory for up to `local_ttl` seconds.
+        """
+        try:
+            if namespace:
+                prefix = f"{namespace}:"
+                self.local.invalidate_matching(lambda local_key: local_key.startswith(prefix))
+                keys = [key async for key in self.redis.scan_iter(match=f"{prefix}*")]
+                return await self.redis.delete(*keys) if keys else 0
+            if key:
+                self.local.invalidate(key)
+                return await self.redis.delete(key)
+        except (RedisError, OSError) as err:
+            logger.warning("Clearing %s from the cache failed: %r", namespace or key, err)
+        return 0
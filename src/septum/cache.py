@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from functools import partial
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache(Generic[T]):
+    """
+    A small process-local cache for upstream data.
+
+    Entries expire `ttl` seconds after they are stored, and once there are more than `maxsize`
+    entries the least recently used one is dropped. Concurrent misses for the same key share a
+    single fetch instead of each going upstream.
+
+    With a `stale_ttl`, an expired entry is still served for that many more seconds by
+    `get_or_fetch`, which refreshes it in the background instead of making the caller wait.
+    """
+
+    def __init__(self, ttl: float, maxsize: int, stale_ttl: float = 0):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.stale_ttl = stale_ttl
+        self.entries: OrderedDict[Hashable, tuple[float, T]] = OrderedDict()
+        self.inflight: dict[Hashable, asyncio.Task] = {}
+
+    def get(self, key: Hashable) -> T | None:
+        """
+        Returns the cached value for `key`, or None if it is missing or expired.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        now = time.monotonic()
+        if expires_at <= now:
+            if expires_at + self.stale_ttl <= now:
+                del self.entries[key]
+            return None
+
+        self.entries.move_to_end(key)
+        return value
+
+    def peek(self, key: Hashable) -> T | None:
+        """
+        Returns the value for `key` even if it has expired, without counting it as a use
+        """
+        entry = self.entries.get(key)
+        return None if entry is None else entry[1]
+
+    def set(self, key: Hashable, value: T, ttl: float | None = None):
+        """
+        Stores `value` for `ttl` seconds, or the cache's TTL if not given.
+
+        A `ttl` of zero or less stores an entry that is already expired, which `get_or_fetch`
+        still serves for `stale_ttl` seconds past its expiry while refreshing it.
+        """
+        self.entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def ttl_left(self, key: Hashable) -> float | None:
+        """
+        How many seconds `key` has left, negative if it has expired, or None if it isn't cached
+        """
+        entry = self.entries.get(key)
+        return None if entry is None else entry[0] - time.monotonic()
+
+    def items_with_ttl(self) -> list[tuple[Hashable, float, T]]:
+        """
+        Every entry with how many seconds it has left, negative if it has expired
+        """
+        now = time.monotonic()
+        return [(key, expires_at - now, value) for key, (expires_at, value) in self.entries.items()]
+
+    def invalidate(self, key: Hashable | None = None):
+        """
+        Drops `key` from the cache, or every entry if no key is given.
+        """
+        if key is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(key, None)
+
+    def invalidate_matching(self, predicate: Callable[[Hashable], bool]):
+        """
+        Drops every entry whose key matches `predicate`.
+        """
+        for key in [key for key in self.entries if predicate(key)]:
+            del self.entries[key]
+
+    async def get_or_fetch(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[T]],
+        should_store: Callable[[T], bool] | None = None,
+    ) -> T:
+        """
+        Returns the cached value for `key`, calling `fetch` to fill it on a miss.
+
+        Failed fetches are not cached, every caller waiting on them gets the exception.
+        Neither are fetched values for which `should_store` returns False.
+
+        A stale entry is returned right away while it is refreshed in the background. If that
+        refresh fails, the stale entry is kept and the next call tries again.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        task = self._fetch(key, fetch, should_store)
+
+        entry = self.entries.get(key)
+        if entry is not None:
+            return entry[1]
+
+        # Shielded so one caller going away doesn't cancel the fetch for everybody else
+        return await asyncio.shield(task)
+
+    def _fetch(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[T]],
+        should_store: Callable[[T], bool] | None,
+    ) -> asyncio.Task:
+        loop = asyncio.get_running_loop()
+        task = self.inflight.get(key)
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(fetch())
+            self.inflight[key] = task
+            task.add_done_callback(partial(self._fetched, key, should_store))
+        return task
+
+    def _fetched(self, key: Hashable, should_store: Callable[[T], bool] | None, task: asyncio.Task):
+        if self.inflight.get(key) is task:
+            del self.inflight[key]
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            if key in self.entries:
+                logger.warning("Refreshing %r failed, serving it stale: %r", key, task.exception())
+            return
+        if should_store is None or should_store(task.result()):
+            self.set(key, task.result())
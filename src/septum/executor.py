@@ -0,0 +1,72 @@
+"""
+Runs CPU-heavy schedule work off the event loop.
+
+EXECUTOR_MODE picks where it runs:
+    inline: On the event loop, like any other code. The default.
+    thread: In a thread pool. Only helps where the work lets go of the GIL, like parsing JSON
+        in large chunks, but keeps one long job from holding up every other request.
+    process: In a process pool, so the work runs on other cores. Arguments and results are
+        pickled on the way there and back, which costs more than small jobs are worth.
+
+Only functions defined at module level can be run, so they can be pickled for a process pool.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TypeVar
+
+T = TypeVar("T")
+
+EXECUTOR_MODE = os.getenv("EXECUTOR_MODE", "inline")
+EXECUTOR_WORKERS = int(os.getenv("EXECUTOR_WORKERS", os.cpu_count() or 1))
+
+MODES = ("inline", "thread", "process")
+if EXECUTOR_MODE not in MODES:
+    raise ValueError(f"Unknown executor mode: {EXECUTOR_MODE}, expected one of {list(MODES)}")
+
+_pool: Executor | None = None
+_mode = EXECUTOR_MODE
+_workers = EXECUTOR_WORKERS
+
+
+def configure(mode: str = EXECUTOR_MODE, workers: int = EXECUTOR_WORKERS):
+    """
+    Switches to another mode, shutting down the current pool if there is one
+    """
+    global _mode, _workers
+    if mode not in MODES:
+        raise ValueError(f"Unknown executor mode: {mode}, expected one of {list(MODES)}")
+    shutdown()
+    _mode, _workers = mode, workers
+
+
+def _get_pool() -> Executor | None:
+    global _pool
+    if _pool is None and _mode == "thread":
+        _pool = ThreadPoolExecutor(max_workers=_workers, thread_name_prefix="septum")
+    elif _pool is None and _mode == "process":
+        # Forking a process with a running event loop and open sockets isn't safe
+        _pool = ProcessPoolExecutor(
+            max_workers=_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+async def run(func: Callable[..., T], *args) -> T:
+    """
+    Calls `func(*args)` wherever EXECUTOR_MODE says to
+    """
+    pool = _get_pool()
+    if pool is None:
+        return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,158 @@
+import csv
+import io
+import sys
+import zipfile
+from collections import defaultdict
+from collections.abc import Hashable
+from datetime import date, datetime
+
+from septum.records import SEPTA_TIMEZONE, Stop, intern_id
+from septum.schedules import ScheduleColumns, ScheduleGenerator, StationIndex
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday")
+WEEKEND = ("saturday", "sunday")
+
+
+class GTFSFeed:
+    """
+    A regional rail GTFS feed loaded into memory and indexed by line, direction and stop.
+
+    Only `stops.txt`, `trips.txt`, `stop_times.txt` and `calendar.txt` are read.
+    """
+
+    def __init__(self, path: str):
+        with zipfile.ZipFile(path) as feed:
+            stops = self._read(feed, "stops.txt")
+            trips = self._read(feed, "trips.txt")
+            stop_times = self._read(feed, "stop_times.txt")
+            calendar = self._read(feed, "calendar.txt")
+
+        self.stop_names = {stop["stop_id"]: stop["stop_name"] for stop in stops}
+
+        # Which services are running is worked out again every day, see `service_ids`
+        self.calendar = calendar
+        self.classified: dict[str, tuple[list[str], list[str]]] = {}
+
+        # calendar.txt has no release name, so the start of the service period stands in for it.
+        # Later periods then win when the same train shows up in more than one.
+        start_dates = {service["service_id"]: service["start_date"] for service in calendar}
+
+        trips_by_id = {}
+        for trip in trips:
+            trips_by_id[trip["trip_id"]] = {
+                "route_id": trip["route_id"],
+                # Septa's train number lives in block_id
+                "block_id": trip.get("block_id") or trip.get("trip_short_name") or trip["trip_id"],
+                "service_id": sys.intern(trip["service_id"]),
+                "direction_id": int(trip["direction_id"]),
+                "release_name": sys.intern(start_dates.get(trip["service_id"], "")),
+            }
+
+        # schedule.json-shaped rows per (line, stop_id), and each trip's stops in order
+        self.schedules: dict[tuple[str, str], list[dict]] = defaultdict(list)
+        trip_stops: dict[str, list[tuple[int, str]]] = defaultdict(list)
+        for stop_time in stop_times:
+            trip = trips_by_id.get(stop_time["trip_id"])
+            if trip is None:
+                continue
+            self.schedules[(trip["route_id"], stop_time["stop_id"])].append(
+                {**trip, "arrival_time": stop_time["arrival_time"]}
+            )
+            trip_stops[stop_time["trip_id"]].append(
+                (int(stop_time["stop_sequence"]), stop_time["stop_id"])
+            )
+
+        patterns: dict[tuple[str, int], list[list[str]]] = defaultdict(list)
+        for trip_id, sequence in trip_stops.items():
+            trip = trips_by_id[trip_id]
+            patterns[(trip["route_id"], trip["direction_id"])].append(
+                [stop_id for _, stop_id in sorted(sequence)]
+            )
+        self.line_stops = {key: self._merge_patterns(value) for key, value in patterns.items()}
+
+    @staticmethod
+    def _read(feed: zipfile.ZipFile, name: str) -> list[dict[str, str]]:
+        with feed.open(name) as file:
+            return list(csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig")))
+
+    def service_ids(self, day: date | None = None) -> tuple[list[str], list[str]]:
+        """
+        Gets the weekday and weekend services running on `day`, today in septa's time by default.
+
+        Results are kept per day, so a long-running process moves on to the next service period
+        the day it starts.
+        """
+        day = (day or datetime.now(SEPTA_TIMEZONE).date()).strftime("%Y%m%d")
+        services = self.classified.get(day)
+        if services is None:
+            # Days are passed in by callers, so don't let them pile up
+            if len(self.classified) >= 32:
+                self.classified.clear()
+            services = self.classified[day] = self._classify_services(self.calendar, day)
+        return services
+
+    @staticmethod
+    def _classify_services(calendar: list[dict[str, str]], day: str) -> tuple[list[str], list[str]]:
+        """
+        Splits the services that are running on `day`, a YYYYMMDD date, into weekday and weekend
+        ones.
+
+        Falls back to every service in the feed if none of them cover that day.
+        """
+        running = [s for s in calendar if s["start_date"] <= day <= s["end_date"]] or calendar
+
+        weekday, weekend = [], []
+        for service in running:
+            if any(service[day] == "1" for day in WEEKDAYS):
+                weekday.append(service["service_id"])
+            if any(service[day] == "1" for day in WEEKEND):
+                weekend.append(service["service_id"])
+        return weekday, weekend
+
+    @staticmethod
+    def _merge_patterns(patterns: list[list[str]]) -> list[str]:
+        """
+        Merges the stopping patterns of every trip in a direction into a single ordered list,
+        starting from the longest one so express and branch trips slot in around it.
+        """
+        order: list[str] = []
+        for pattern in sorted(patterns, key=len, reverse=True):
+            previous = None
+            for stop_id in pattern:
+                if stop_id not in order:
+                    order.insert(0 if previous is None else order.index(previous) + 1, stop_id)
+                previous = stop_id
+        return order
+
+
+class GTFSScheduleGenerator(ScheduleGenerator):
+    """
+    A ScheduleGenerator that answers from a local GTFS feed instead of flat-api.septa.org
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.feed = GTFSFeed(path)
+
+    async def _fetch_stops(self, line: str) -> dict[int, StationIndex]:
+        return {
+            direction_int: StationIndex(
+                [
+                    Stop(intern_id(stop_id), self.feed.stop_names[stop_id])
+                    for stop_id in self.feed.line_stops.get((line, direction_int), [])
+                ]
+            )
+            for direction_int in (0, 1)
+        }
+
+    async def _fetch_schedule(self, line: str, stop_id: str) -> ScheduleColumns:
+        return ScheduleColumns(self.feed.schedules.get((line, stop_id), []))
+
+    def get_service_ids(
+        self, columns: ScheduleColumns, day: date | None = None
+    ) -> tuple[list[str], list[str]]:
+        return self.feed.service_ids(day)
+
+    def service_period(self, day: date | None = None) -> Hashable:
+        weekday, weekend = self.feed.service_ids(day)
+        return tuple(weekday), tuple(weekend)
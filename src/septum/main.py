@@ -1,25 +1,41 @@
+import asyncio
 import os
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 from typing import Annotated
 
-from fastapi import Depends, FastAPI
+from fastapi import Depends, FastAPI, Response
+from fastapi.responses import StreamingResponse
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi_cache import FastAPICache
-from fastapi_cache.backends.redis import RedisBackend
 from fastapi_cache.decorator import cache
-from redis import asyncio as aioredis
 
+import septum.backend as backend
+import septum.executor as executor
+import septum.metrics as metrics
 import septum.scrapers as scrapers
+import septum.snapshot as snapshot
+import septum.upstream as upstream
+import septum.warmup as warmup
+from septum.enums import Direction
 from septum.models import (
     BusAndTrolleyOutput,
     LinesOutput,
+    NextDeparturesInput,
+    ScheduleDestAndOrigItemOutput,
+    ScheduleDestOnlyOutput,
     ScheduleInput,
+    ScheduleLineStationOutput,
     ScheduleMainOutput,
     ScheduleStationOuput,
     StationInput,
     StationOutput,
+    get_schedule,
+    valid_next_departures_input,
+    valid_schedule_input,
+    valid_stations,
 )
+from septum.results import ResultCache
 from septum.schedules import ScheduleGenerator
 
 redis_host = os.getenv("REDIS_HOST", "localhost")
@@ -28,16 +44,52 @@ redis_port = os.getenv("REDIS_PORT", 6379)
 
 @asynccontextmanager
 async def lifespan(_: FastAPI) -> AsyncIterator[None]:
-    redis = aioredis.from_url(f"redis://{redis_host}:{redis_port}")
-    FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache")
+    redis = backend.connect(f"redis://{redis_host}:{redis_port}")
+    FastAPICache.init(backend.TieredBackend(redis), prefix="fastapi-cache")
+    results.redis = redis
+    schedule.feeds.redis = redis
+
+    background = []
+    if snapshot.SNAPSHOT_PATH is not None:
+        snapshot.load(schedule, snapshot.SNAPSHOT_PATH)
+        background.append(asyncio.create_task(snapshot.run(schedule, snapshot.SNAPSHOT_PATH)))
+    if warmup.WARMUP_ENABLED:
+        background.append(asyncio.create_task(warmup.run(schedule)))
+
     yield
 
+    for task in background:
+        task.cancel()
+    if snapshot.SNAPSHOT_PATH is not None and await schedule.feeds.lead("snapshot", ttl=60):
+        await snapshot.save(schedule, snapshot.SNAPSHOT_PATH)
+    await upstream.close_client()
+    executor.shutdown()
+    await redis.close(close_connection_pool=True)
+
 
 app = FastAPI(docs_url=None, lifespan=lifespan)
-schedule = ScheduleGenerator()
+if metrics.METRICS_ENABLED or metrics.SERVER_TIMING:
+    app.add_middleware(metrics.MetricsMiddleware)
+results = ResultCache()
+schedule = get_schedule()
+schedule.change_listeners.append(results.invalidate_line)
 SECONDS_IN_A_WEEK = 604800
 SECONDS_IN_A_DAY = 86400
 
+# The cache namespaces of the endpoints built from each scraped page
+PAGE_NAMESPACES = {
+    scrapers.STATION_NAMES_URL: ("stations",),
+    scrapers.BUS_AND_TROLLEY_ROUTES_URL: ("bus-routes", "trolley-routes"),
+}
+
+
+async def clear_page_endpoints(url: str):
+    for namespace in PAGE_NAMESPACES[url]:
+        await FastAPICache.clear(namespace=namespace)
+
+
+scrapers.change_listeners.append(clear_page_endpoints)
+
 
 @app.get("/", include_in_schema=False)
 async def custom_swagger_ui_html():
@@ -48,9 +100,17 @@ async def custom_swagger_ui_html():
     )
 
 
+if metrics.METRICS_ENABLED:
+
+    @app.get("/metrics", include_in_schema=False)
+    async def get_metrics():
+        content, media_type = metrics.render()
+        return Response(content=content, media_type=media_type)
+
+
 # Basic Stations endpoint
 @app.get("/api/stations", response_model=list[StationOutput])
-@cache(expire=SECONDS_IN_A_WEEK)
+@cache(expire=SECONDS_IN_A_WEEK, namespace="stations")
 async def get_stations():
     """
     Retrieves "Regional Rail Inputs" used by setpa's public API (e.g, the `/NextToArrive/index.php` endpoint).
@@ -63,12 +123,12 @@ async def get_stations():
         These are NOT the same the stations returned by `/schedule/stations` endpoint.
         Those are for an API that is not publicly documented. See `/schedule/stations` for more info.
     """
-    return scrapers.get_station_names()
+    return await scrapers.get_station_names()
 
 
 # Route Endpoints
 @app.get("/api/routes/bus", response_model=list[BusAndTrolleyOutput])
-@cache(expire=SECONDS_IN_A_WEEK)
+@cache(expire=SECONDS_IN_A_WEEK, namespace="bus-routes")
 async def get_bus_routes():
     """
     Retrieve bus routes used by septa's public API (e.g, the `/TransitView/index.php` endpoint).
@@ -77,11 +137,11 @@ async def get_bus_routes():
         A list of dictionaries where `route_name` is the colloquial name of a given bus route,
             and `route_number` (not always a "number") is what the API expects.
     """
-    return scrapers.get_bus_routes()
+    return await scrapers.get_bus_routes()
 
 
 @app.get("/api/routes/trolley", response_model=list[BusAndTrolleyOutput])
-@cache(expire=SECONDS_IN_A_WEEK)
+@cache(expire=SECONDS_IN_A_WEEK, namespace="trolley-routes")
 async def get_trolley_routes():
     """
     Retrieve trolley routes used by septa's public API (e.g, the `/TransitView/index.php` endpoint).
@@ -90,12 +150,12 @@ async def get_trolley_routes():
         A list of dictionaries where `route_name` is the colloquial name of a given trolley route,
             and `route_number` is what the API expects.
     """
-    return scrapers.get_trolley_routes()
+    return await scrapers.get_trolley_routes()
 
 
 # Schedule Endpoints
 @app.get("/api/schedule/lines", response_model=list[LinesOutput])
-async def get_lines():
+async def get_lines(schedule: Annotated[ScheduleGenerator, Depends(get_schedule)]):
     """
     Retrieve a list of all available lines. Each line is represented by its code and name.
 
@@ -106,7 +166,10 @@ async def get_lines():
 
 
 @app.get("/api/schedule/stations", response_model=list[ScheduleStationOuput])
-async def get_stations_for_lines(line: Annotated[StationInput, Depends()]):
+async def get_stations_for_lines(
+    line: Annotated[StationInput, Depends()],
+    schedule: Annotated[ScheduleGenerator, Depends(get_schedule)],
+):
     """
     Retrieve a list of stations for a specific line.
 
@@ -128,11 +191,20 @@ async def get_stations_for_lines(line: Annotated[StationInput, Depends()]):
         These station names are not the same as `/stations`. These are to be used with the `/schedule` endpoint,
         and not with the public septa api.
     """
-    return schedule.get_stations_for_line(line.line, line.direction)
+    direction = line.direction or Direction.INBOUND
+    return await results.respond(
+        line.line,
+        (line.line, "stations", direction.value),
+        list[ScheduleStationOuput],
+        lambda: schedule.get_stations_for_line(line.line, direction),
+    )
 
 
 @app.get("/api/schedule", response_model=ScheduleMainOutput)
-async def get_schedule_for_station(query: Annotated[ScheduleInput, Depends()]):
+async def get_schedule_for_station(
+    query: Annotated[ScheduleInput, Depends(valid_schedule_input)],
+    schedule: Annotated[ScheduleGenerator, Depends(get_schedule)],
+):
     """
     Retrieve the schedule for a specific station on a given route.
 
@@ -168,7 +240,103 @@ async def get_schedule_for_station(query: Annotated[ScheduleInput, Depends()]):
         Some of the items might be for trains that don't go anywhere after this station. Therefore passing in `dest`
         is recommended.
     """
-    if query.dest is not None:
-        return schedule.get_schedule_for_line(query.line, query.orig, query.dest, query.direction)
 
-    return schedule.get_schedule_for_station(query.line, query.orig, query.direction)
+    async def compute():
+        if query.dest is not None:
+            return await schedule.get_schedule_for_line(
+                query.line, query.orig, query.dest, query.direction
+            )
+
+        return await schedule.get_schedule_for_station(query.line, query.orig, query.direction)
+
+    return await results.respond(
+        query.line,
+        (query.line, "schedule", query.direction.value, query.orig, query.dest or ""),
+        ScheduleMainOutput,
+        compute,
+    )
+
+
+@app.get("/api/schedule/line", response_model=list[ScheduleLineStationOutput])
+async def get_schedule_for_all_stations(
+    line: Annotated[StationInput, Depends()],
+    stations: Annotated[list[str] | None, Depends(valid_stations)],
+    schedule: Annotated[ScheduleGenerator, Depends(get_schedule)],
+):
+    """
+    Retrieve the schedule for every station on a line at once, e.g. to show a whole timetable.
+
+    Args:
+        line (str): The transit line code.
+        direction: (str, None): "inbound" (default)/"outbound"
+        stations (list[str], optional): Station names to limit the result to, can be passed more than once.
+
+    Returns:
+        A list with one dictionary per station, in the order the line runs in that direction, each with:
+            - stop_id (str): The station's ID
+            - stop_name (str): The station's name
+            - weekday: List of schedule items for weekdays.
+            - weekend: List of schedule items for weekends.
+            Each schedule item is a dictionary with `departure_time` and `train_id`, like `/schedule`
+            when only `orig` is passed in.
+
+    Note:
+        The stations are fetched all at once, and the response is streamed one station at a time
+        once they are all in. If any station can't be fetched, the whole request fails with a 503.
+        The same caveat as `/schedule` without `dest` applies, some of the trains might not stop
+        anywhere after a given station.
+    """
+    direction = line.direction or Direction.INBOUND
+    station_schedules = await schedule.get_schedules_for_stations(line.line, direction, stations)
+
+    async def body() -> AsyncIterator[bytes]:
+        separator = b"["
+        async for station_schedule in station_schedules:
+            yield separator + results.serialize(ScheduleLineStationOutput, station_schedule)
+            separator = b","
+        yield b"[]" if separator == b"[" else b"]"
+
+    return StreamingResponse(body(), media_type="application/json")
+
+
+@app.get(
+    "/api/schedule/next",
+    response_model=list[ScheduleDestOnlyOutput | ScheduleDestAndOrigItemOutput],
+)
+async def get_next_departures(
+    query: Annotated[NextDeparturesInput, Depends(valid_next_departures_input)],
+    schedule: Annotated[ScheduleGenerator, Depends(get_schedule)],
+):
+    """
+    Retrieve only the next few trains from a station, instead of the whole day like `/schedule`.
+
+    Args:
+        line (str): The transit line code.
+        direction (Direction): The direction of travel. "inbound" or "outbound"
+        orig (str): The origin station name.
+        dest (str, optional): The destination station name.
+        count (int, optional): How many trains to return, 5 by default.
+        after (str, optional): Only trains leaving at or after this time (e.g., "17:30"), now by default,
+            or midnight if `day` is passed.
+        day (str, optional): The day of travel (e.g., "2024-08-24"), today by default.
+            Weekday or weekend service is picked based on it.
+
+    Returns:
+        A list of up to `count` schedule items, sorted by departure time, in the same format as
+        the items returned by `/schedule`.
+
+    Note:
+        The default time and day are septa's local time. Trains that leave after midnight but are
+        listed as part of the previous day's service are not included. Holidays are not accounted
+        for, they are treated like any other weekday. See `/schedule` for how to pick the `direction`.
+    """
+    day, after = query.when()
+    departures = await schedule.get_next_departures(
+        query.line, query.orig, query.dest, query.direction, day, after, query.count
+    )
+    return Response(
+        content=results.serialize(
+            list[ScheduleDestOnlyOutput | ScheduleDestAndOrigItemOutput], departures
+        ),
+        media_type="application/json",
+    )
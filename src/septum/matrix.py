@@ -0,0 +1,129 @@
+import os
+import sys
+import time
+from array import array
+from collections import OrderedDict
+
+from septum.records import Departure, Trip
+
+# Opt in to precomputing every origin-destination pair on a line, see `TripMatrix`
+MATRIX_ENABLED = os.getenv("MATRIX_ENABLED", "false").lower() in ("1", "true", "yes")
+# Roughly how many bytes all the kept matrices may take up, least recently used go first
+MATRIX_MEMORY_BUDGET = int(os.getenv("MATRIX_MEMORY_BUDGET", 64 * 1024 * 1024))
+
+
+class TripMatrix:
+    """
+    The stop times of every train on a line, for one direction and one kind of service.
+
+    Trains are numbered, and each stop keeps a column with the train's time there (or -1) in
+    that order, plus its departures sorted by time. Trips between any two stops then come from
+    walking the origin's departures and reading the destination's column, with no joining or
+    sorting per request.
+    """
+
+    __slots__ = ("columns", "train_ids", "stop_times", "departures", "nbytes")
+
+    def __init__(self, stop_ids: list[str], schedules: list[list[Departure]]):
+        """
+        Args:
+            stop_ids (list[str]): The stops on the line, in order.
+            schedules (list[list[Departure]]): Each stop's trains, sorted by departure time as
+                `ScheduleColumns.most_recent` returns them.
+        """
+        self.columns = {stop_id: column for column, stop_id in enumerate(stop_ids)}
+        self.train_ids: list[str] = []
+        trains: dict[str, int] = {}
+        for departures in schedules:
+            for departure in departures:
+                if departure.train_id not in trains:
+                    trains[departure.train_id] = len(self.train_ids)
+                    self.train_ids.append(departure.train_id)
+
+        self.stop_times: list[array] = []
+        # Each stop's departures as (time, train number) pairs, flattened into one array
+        self.departures: list[array] = []
+        for departures in schedules:
+            times = array("i", [-1]) * len(self.train_ids)
+            flattened = array("i")
+            for time, train_id in departures:
+                train = trains[train_id]
+                times[train] = time
+                flattened.extend((time, train))
+            self.stop_times.append(times)
+            self.departures.append(flattened)
+
+        # The train IDs themselves are shared with the schedule cache
+        self.nbytes = (
+            sys.getsizeof(self.train_ids)
+            + sum(map(sys.getsizeof, self.stop_times))
+            + sum(map(sys.getsizeof, self.departures))
+        )
+
+    def trips(self, orig_stop_id: str, dest_stop_id: str) -> list[Trip]:
+        """
+        Gets the trains that stop at both stops, sorted by departure time from `orig_stop_id`.
+        """
+        arrivals = self.stop_times[self.columns[dest_stop_id]]
+        departures = self.departures[self.columns[orig_stop_id]]
+        train_ids = self.train_ids
+        return [
+            Trip(departure, arrivals[train], train_ids[train])
+            for departure, train in zip(departures[::2], departures[1::2])
+            if arrivals[train] != -1
+        ]
+
+
+class MatrixStore:
+    """
+    Keeps built matrices, keyed by (line, direction ID, service period), within a memory budget.
+
+    Each entry is the (weekday, weekend) pair of matrices for that line and direction, kept for as
+    long as the schedules it was built from.
+    """
+
+    def __init__(self, budget: int = MATRIX_MEMORY_BUDGET):
+        self.budget = budget
+        self.nbytes = 0
+        self.entries: OrderedDict[tuple, tuple[float, tuple[TripMatrix, TripMatrix]]] = (
+            OrderedDict()
+        )
+
+    def get(self, key: tuple) -> tuple[TripMatrix, TripMatrix] | None:
+        """
+        Returns the matrices for `key`, or None if they are missing or expired.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, matrices = entry
+        if expires_at <= time.monotonic():
+            self.invalidate(key)
+            return None
+        self.entries.move_to_end(key)
+        return matrices
+
+    def set(self, key: tuple, matrices: tuple[TripMatrix, TripMatrix], ttl: float):
+        """
+        Keeps `matrices` for `ttl` seconds, dropping the least recently used ones to stay within
+        the budget.
+
+        Matrices bigger than the whole budget, or that have already expired, are not kept at all.
+        """
+        self.invalidate(key)
+        nbytes = sum(matrix.nbytes for matrix in matrices)
+        if nbytes > self.budget or ttl <= 0:
+            return
+        while self.entries and self.nbytes + nbytes > self.budget:
+            self.invalidate(next(iter(self.entries)))
+        self.entries[key] = (time.monotonic() + ttl, matrices)
+        self.nbytes += nbytes
+
+    def invalidate(self, key: tuple):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= sum(matrix.nbytes for matrix in entry[1])
+
+    def invalidate_line(self, line: str):
+        for key in [key for key in self.entries if key[0] == line]:
+            self.invalidate(key)
@@ -0,0 +1,181 @@
+"""
+Request timing and Prometheus metrics.
+
+Code that does something worth timing wraps it in `phase`, e.g. `with metrics.phase("upstream"):`.
+Every phase is recorded in the `septum_phase_seconds` histogram. During a request, phases are also
+added up per request, so they can be sent back as a Server-Timing header. Phases can overlap,
+e.g. validation includes any upstream requests it needs to make.
+
+`MetricsMiddleware` times whole requests and records cache hits and misses per endpoint. With
+METRICS_ENABLED set, the metrics are served on `/metrics` in Prometheus' text format. It's off by
+default, since `/metrics` is served on the same port as the API, so keep it behind the reverse
+proxy when turning it on.
+
+With both METRICS_ENABLED and SERVER_TIMING turned off, `phase` hands back a shared no-op and
+the middleware isn't installed at all.
+"""
+
+import os
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+# Send a Server-Timing header with how long each phase of a request took
+SERVER_TIMING = os.getenv("SERVER_TIMING", "false").lower() in ("1", "true", "yes")
+
+REQUEST_SECONDS = Histogram(
+    "septum_request_seconds", "Time spent handling requests", ("route", "method", "status")
+)
+PHASE_SECONDS = Histogram(
+    "septum_phase_seconds", "Time spent in each phase of handling a request", ("phase",)
+)
+UPSTREAM_SECONDS = Histogram(
+    "septum_upstream_request_seconds",
+    "Time spent on requests to septa's servers",
+    ("host", "status"),
+)
+CACHE_REQUESTS = Counter(
+    "septum_cache_requests_total", "Cached endpoint lookups", ("route", "result")
+)
+
+# fastapi-cache marks its responses with this header
+FASTAPI_CACHE_HEADER = b"x-fastapi-cache"
+
+
+class RequestTimings:
+    """
+    What one request spent its time on, filled in while it runs
+    """
+
+    __slots__ = ("phases", "cache")
+
+    def __init__(self):
+        self.phases: dict[str, float] = {}
+        self.cache: str | None = None
+
+    def server_timing(self, total: float) -> bytes:
+        entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.phases.items()]
+        if self.cache is not None:
+            entries.append(f'cache;desc="{self.cache}"')
+        entries.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(entries).encode()
+
+
+_current: ContextVar[RequestTimings | None] = ContextVar("septum_request_timings", default=None)
+
+
+class _Phase:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        if METRICS_ENABLED:
+            PHASE_SECONDS.labels(self.name).observe(elapsed)
+        timings = _current.get()
+        if timings is not None:
+            timings.phases[self.name] = timings.phases.get(self.name, 0.0) + elapsed
+
+
+_disabled = nullcontext()
+
+
+def phase(name: str):
+    """
+    Times the body of a `with` block as part of the `name` phase (e.g. "upstream", "validation")
+    """
+    if not (METRICS_ENABLED or SERVER_TIMING):
+        return _disabled
+    return _Phase(name)
+
+
+def observe_upstream(host: str, status: int | str, seconds: float):
+    if METRICS_ENABLED:
+        UPSTREAM_SECONDS.labels(host, str(status)).observe(seconds)
+
+
+def cache_result(hit: bool):
+    """
+    Marks the current request as served from cache or not
+    """
+    timings = _current.get()
+    if timings is not None:
+        timings.cache = "hit" if hit else "miss"
+
+
+def render() -> tuple[bytes, str]:
+    """
+    The current metrics in Prometheus' text format, and the content type to serve them with
+
+    With several workers, PROMETHEUS_MULTIPROC_DIR should point to an empty directory they all
+    write to, so every worker's metrics are added up here.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request and adds a Server-Timing header to it if SERVER_TIMING is set.
+
+    Requests are labelled with the route they matched rather than their path, so query strings
+    and bad URLs don't create new series. A streamed response's header is sent before the body
+    is built, so its Server-Timing only covers the work done up to that point.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name.lower() == FASTAPI_CACHE_HEADER:
+                        timings.cache = "hit" if value == b"HIT" else "miss"
+                if SERVER_TIMING:
+                    header = (b"server-timing", timings.server_timing(time.perf_counter() - start))
+                    message["headers"] = [*message.get("headers", ()), header]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            if METRICS_ENABLED:
+                route = scope.get("route")
+                path = getattr(route, "path", "unmatched")
+                REQUEST_SECONDS.labels(path, scope["method"], str(status)).observe(
+                    time.perf_counter() - start
+                )
+                if timings.cache is not None:
+                    CACHE_REQUESTS.labels(path, timings.cache).inc()
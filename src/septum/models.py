@@ -1,10 +1,42 @@
-from fastapi import HTTPException
-from pydantic import BaseModel, field_validator, model_validator
+import os
+from datetime import date, datetime, time
+from typing import Annotated
 
+from fastapi import Depends, HTTPException, Query
+from pydantic import BaseModel, field_validator
+
+import septum.metrics as metrics
 from septum.enums import Direction
+from septum.records import SEPTA_TIMEZONE
 from septum.schedules import ScheduleGenerator
 
-schedule = ScheduleGenerator()
+# Set GTFS_PATH to a regional rail GTFS zip to answer schedules from it instead of flat-api
+GTFS_PATH = os.getenv("GTFS_PATH")
+
+
+def make_schedule() -> ScheduleGenerator:
+    if GTFS_PATH is None:
+        return ScheduleGenerator()
+
+    # Only imported when it's used, like the optional HTML parsers in septum.tables
+    from septum.gtfs import GTFSScheduleGenerator
+
+    return GTFSScheduleGenerator(GTFS_PATH)
+
+
+schedule = make_schedule()
+
+
+def get_schedule() -> ScheduleGenerator:
+    """
+    The ScheduleGenerator shared by every endpoint and validator.
+
+    Endpoints get it as a dependency, so it can be swapped out with `app.dependency_overrides`.
+    """
+    return schedule
+
+
+MAX_NEXT_DEPARTURES = int(os.getenv("MAX_NEXT_DEPARTURES", 50))
 
 
 class StationInput(BaseModel):
@@ -13,7 +45,7 @@ class StationInput(BaseModel):
 
     @field_validator("line")
     def validate_line(cls, value):
-        if value not in [line["line_code"] for line in schedule.LINES]:
+        if value not in schedule.LINE_CODES:
             raise HTTPException(status_code=400, detail=f"Invalid Line: {value}")
         return value
 
@@ -25,41 +57,104 @@ class ScheduleInput(BaseModel):
     dest: str | None = None
 
     @staticmethod
-    def validate_orig_dest_for_direction(line: str, orig: str, dest: str, direction: Direction):
-        stations = [stop["stop_name"] for stop in schedule.get_stations_for_line(line, direction)]
-        orig_index = stations.index(orig)
+    async def validate_orig_dest_for_direction(
+        schedule: ScheduleGenerator, line: str, orig: str, dest: str, direction: Direction
+    ):
+        positions = (await schedule.get_station_index(line, direction)).positions
+
+        orig_position = positions.get(orig)
+        dest_position = positions.get(dest)
 
-        if dest not in stations[orig_index + 1 :]:
+        if orig_position is None or dest_position is None or dest_position <= orig_position:
             raise HTTPException(
                 status_code=400, detail=f"cannot go from {orig} to {dest} going {direction.value}"
             )
 
     @staticmethod
-    def validate_station_for_line(line: str, station: str):
-        stations_for_line = [stop["stop_name"] for stop in schedule.get_stations_for_line(line)]
-        if station not in stations_for_line:
+    async def validate_station_for_line(schedule: ScheduleGenerator, line: str, station: str):
+        if station not in (await schedule.get_station_index(line)).positions:
             raise HTTPException(
                 status_code=400, detail=f"Invalid Station: {station} for line: {line}"
             )
 
     @field_validator("line")
     def validate_line(cls, value):
-        if value not in [line["line_code"] for line in schedule.LINES]:
+        if value not in schedule.LINE_CODES:
             raise HTTPException(status_code=400, detail=f"Invalid Line: {value}")
         return value
 
-    @model_validator(mode="after")
-    def validate_mode(self):
-
-        self.validate_station_for_line(self.line, self.orig)
+    async def validate_mode(self, schedule: ScheduleGenerator):
+        # Checking stations needs the upstream stop list, which can't be awaited from
+        # a pydantic validator, so this runs as part of the `valid_schedule_input` dependency
+        await self.validate_station_for_line(schedule, self.line, self.orig)
         if self.dest is not None:
-            self.validate_station_for_line(self.line, self.dest)
-            self.validate_orig_dest_for_direction(self.line, self.orig, self.dest, self.direction)
+            await self.validate_station_for_line(schedule, self.line, self.dest)
+            await self.validate_orig_dest_for_direction(
+                schedule, self.line, self.orig, self.dest, self.direction
+            )
             return self
 
         return self
 
 
+async def valid_schedule_input(
+    query: Annotated[ScheduleInput, Depends()],
+    schedule: Annotated[ScheduleGenerator, Depends(get_schedule)],
+) -> ScheduleInput:
+    with metrics.phase("validation"):
+        return await query.validate_mode(schedule)
+
+
+class NextDeparturesInput(ScheduleInput):
+    count: int = 5
+    after: time | None = None
+    day: date | None = None
+
+    @field_validator("count")
+    def validate_count(cls, value):
+        if not 1 <= value <= MAX_NEXT_DEPARTURES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid Count: {value}, must be between 1 and {MAX_NEXT_DEPARTURES}",
+            )
+        return value
+
+    def when(self) -> tuple[date, str]:
+        """
+        The day and "HH:MM:SS" time to look for departures from, defaulting to now.
+
+        If only `day` is given, the whole day is covered, from midnight.
+        """
+        now = datetime.now(SEPTA_TIMEZONE)
+        if self.after is not None:
+            after = self.after
+        elif self.day is not None:
+            after = time(0, 0)
+        else:
+            after = now.time()
+        return self.day or now.date(), after.strftime("%H:%M:%S")
+
+
+async def valid_next_departures_input(
+    query: Annotated[NextDeparturesInput, Depends()],
+    schedule: Annotated[ScheduleGenerator, Depends(get_schedule)],
+) -> NextDeparturesInput:
+    with metrics.phase("validation"):
+        return await query.validate_mode(schedule)
+
+
+async def valid_stations(
+    line: Annotated[StationInput, Depends()],
+    schedule: Annotated[ScheduleGenerator, Depends(get_schedule)],
+    stations: Annotated[list[str] | None, Query()] = None,
+) -> list[str] | None:
+    if stations is not None:
+        with metrics.phase("validation"):
+            for station in stations:
+                await ScheduleInput.validate_station_for_line(schedule, line.line, station)
+    return stations
+
+
 class StationOutput(BaseModel):
     station_name: str
     parameter: str
@@ -94,3 +189,10 @@ class ScheduleDestAndOrigItemOutput(BaseModel):
 class ScheduleMainOutput(BaseModel):
     weekday: list[ScheduleDestOnlyOutput | ScheduleDestAndOrigItemOutput]
     weekend: list[ScheduleDestOnlyOutput | ScheduleDestAndOrigItemOutput]
+
+
+class ScheduleLineStationOutput(BaseModel):
+    stop_id: str
+    stop_name: str
+    weekday: list[ScheduleDestOnlyOutput]
+    weekend: list[ScheduleDestOnlyOutput]
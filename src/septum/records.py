@@ -0,0 +1,77 @@
+"""
+Compact records for stops and trains, used from parsing all the way to the response.
+
+They are plain tuples, so they take a fraction of the memory of a dict and sort and compare
+natively. Times are seconds since midnight, and go past 24:00 for trains after midnight the way
+septa's and GTFS times do. `to_dict` turns a record into the response format.
+"""
+
+import sys
+from functools import lru_cache
+from typing import NamedTuple
+from zoneinfo import ZoneInfo
+
+# Septa's local time, which "today" and "now" are in
+SEPTA_TIMEZONE = ZoneInfo("America/New_York")
+
+
+def parse_time(value: str) -> int:
+    """
+    Turns an "HH:MM:SS" time into seconds since midnight
+    """
+    hours, minutes, seconds = value.split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+@lru_cache(maxsize=4096)
+def format_time(seconds: int) -> str:
+    """
+    Turns seconds since midnight into an "HH:MM:SS" time
+    """
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+def intern_id(value: str | int) -> str:
+    """
+    Returns `value` as a string, shared with every other record that has the same ID
+    """
+    return sys.intern(str(value))
+
+
+class Stop(NamedTuple):
+    stop_id: str
+    stop_name: str
+
+    def to_dict(self) -> dict[str, str]:
+        return {"stop_id": self.stop_id, "stop_name": self.stop_name}
+
+
+class Departure(NamedTuple):
+    """
+    A train leaving a stop
+    """
+
+    time: int
+    train_id: str
+
+    def to_dict(self) -> dict[str, str]:
+        return {"departure_time": format_time(self.time), "train_id": self.train_id}
+
+
+class Trip(NamedTuple):
+    """
+    A train going from one stop to another
+    """
+
+    departure: int
+    arrival: int
+    train_id: str
+
+    def to_dict(self) -> dict[str, str]:
+        return {
+            "departure_time": format_time(self.departure),
+            "arrival_time": format_time(self.arrival),
+            "train_id": self.train_id,
+        }
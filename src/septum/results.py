@@ -0,0 +1,179 @@
+import logging
+import os
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import pydantic_core
+from fastapi import Response
+from pydantic import TypeAdapter
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+import septum.backend as backend
+import septum.metrics as metrics
+from septum.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+RESULTS_CACHE_TTL = int(os.getenv("RESULTS_CACHE_TTL", 3600))
+RESULTS_LOCAL_TTL = int(os.getenv("RESULTS_LOCAL_TTL", 60))
+RESULTS_LOCAL_MAXSIZE = int(os.getenv("RESULTS_LOCAL_MAXSIZE", 1024))
+# Validate results against their response model before encoding them, e.g. while debugging
+RESULTS_VALIDATE = os.getenv("RESULTS_VALIDATE", "false").lower() in ("1", "true", "yes")
+
+
+class ResultCache:
+    """
+    Caches serialized schedule responses, keyed by line, direction and stations.
+
+    Lookups go to an in-process LRU first and then to Redis, which is shared between replicas.
+    Large bodies are compressed in Redis, like the ones `backend.TieredBackend` stores.
+    Entries for a line are dropped from both whenever `invalidate_line` is called, which is hooked
+    up to ScheduleGenerator's change listeners.
+    """
+
+    PREFIX = "septum-results"
+
+    def __init__(
+        self,
+        ttl: int = RESULTS_CACHE_TTL,
+        local_ttl: int = RESULTS_LOCAL_TTL,
+        local_maxsize: int = RESULTS_LOCAL_MAXSIZE,
+        validate: bool = RESULTS_VALIDATE,
+    ):
+        self.ttl = ttl
+        self.local: TTLCache[bytes] = TTLCache(ttl=min(ttl, local_ttl), maxsize=local_maxsize)
+        self.redis: aioredis.Redis | None = None
+        self.validate = validate
+        self.adapters: dict[Any, TypeAdapter] = {}
+
+    def _redis_key(self, key: tuple[str, ...]) -> str:
+        return ":".join((self.PREFIX, *key))
+
+    def _line_key(self, line: str) -> str:
+        return f"{self.PREFIX}-line:{line}"
+
+    def serialize(self, response_model: Any, data: Any) -> bytes:
+        """
+        Dumps `data`, which has the shape of `response_model`, to JSON.
+
+        ScheduleGenerator builds its results as plain dicts and lists with the same fields, in the
+        same order, as the response models, so they are encoded as they are. Going through the
+        model first, like FastAPI would, only happens if `validate` is set.
+        """
+        with metrics.phase("serialize"):
+            if not self.validate:
+                return pydantic_core.to_json(data)
+
+            adapter = self.adapters.get(response_model)
+            if adapter is None:
+                adapter = self.adapters[response_model] = TypeAdapter(response_model)
+            return adapter.dump_json(adapter.validate_python(data))
+
+    async def respond(
+        self,
+        line: str,
+        key: tuple[str, ...],
+        response_model: Any,
+        compute: Callable[[], Awaitable[Any]],
+    ) -> Response:
+        """
+        Returns the cached response for `key`, or computes, serializes and caches it on a miss.
+
+        Empty results, e.g. no trains on weekdays or weekends, are sent but not cached. They most
+        likely come from an upstream hiccup, like the empty schedules ScheduleGenerator drops.
+
+        Args:
+            line (str): The line the result belongs to, used for invalidation.
+            key (tuple[str, ...]): The rest of the cache key, it should start with `line`.
+            response_model (Any): The endpoint's response model.
+            compute (Callable[[], Awaitable[Any]]): Builds the result on a miss.
+        """
+
+        hit = True
+        store = True
+
+        async def fetch() -> bytes:
+            body = await self._get_shared(key)
+            if body is None:
+                nonlocal hit, store
+                hit = False
+                data = await compute()
+                body = self.serialize(response_model, data)
+                store = not self._is_empty(data)
+                if store:
+                    await self._set_shared(line, key, body)
+            return body
+
+        body = await self.local.get_or_fetch(key, fetch, should_store=lambda _: store)
+        metrics.cache_result(hit)
+        return Response(content=body, media_type="application/json")
+
+    @staticmethod
+    def _is_empty(data: Any) -> bool:
+        # A list of stations or trains, or a dict of them like {"weekday": [], "weekend": []}
+        if isinstance(data, dict):
+            return not any(data.values())
+        return not data
+
+    async def _get_shared(self, key: tuple[str, ...]) -> bytes | None:
+        if self.redis is None:
+            return None
+        try:
+            with metrics.phase("redis"):
+                return backend.decompress(await self.redis.get(self._redis_key(key)))
+        except (RedisError, OSError) as err:
+            logger.warning("Result cache lookup failed: %r", err)
+            return None
+
+    async def _set_shared(self, line: str, key: tuple[str, ...], body: bytes):
+        if self.redis is None:
+            return
+        redis_key = self._redis_key(key)
+        try:
+            with metrics.phase("redis"):
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    pipe.set(redis_key, backend.compress(body), ex=self.ttl)
+                    pipe.sadd(self._line_key(line), redis_key)
+                    pipe.expire(self._line_key(line), self.ttl)
+                    await pipe.execute()
+        except (RedisError, OSError) as err:
+            logger.warning("Result cache store failed: %r", err)
+
+    @staticmethod
+    def _affected(key: tuple[str, ...], stations: frozenset[str] | None) -> bool:
+        # Keys are (line, "stations", direction) or (line, "schedule", direction, orig, dest),
+        # a line's stop lists don't depend on any one stop's schedule
+        if stations is None:
+            return True
+        return key[1] == "schedule" and bool(stations.intersection(key[3:]))
+
+    async def invalidate_line(self, line: str, stations: frozenset[str] | None = None):
+        """
+        Drops the cached results for `line`, locally and in Redis
+
+        Args:
+            line (str): The line that changed.
+            stations (frozenset[str] | None): Only drop the schedules to or from these stops,
+                every result for the line if None.
+        """
+        self.local.invalidate_matching(lambda key: key[0] == line and self._affected(key, stations))
+        if self.redis is None:
+            return
+        try:
+            keys = await self.redis.smembers(self._line_key(line))
+            if stations is None:
+                await self.redis.delete(*keys, self._line_key(line))
+                return
+            prefix = len(self.PREFIX) + 1
+            affected = []
+            for key in keys:
+                parts = tuple(key.decode()[prefix:].split(":"))
+                # A stop name with a colon in it can't be split back out, so drop it to be safe
+                if len(parts) > 5 or self._affected(parts, stations):
+                    affected.append(key)
+            if affected:
+                await self.redis.delete(*affected)
+                await self.redis.srem(self._line_key(line), *affected)
+        except (RedisError, OSError) as err:
+            logger.warning("Result cache invalidation failed for %s: %r", line, err)
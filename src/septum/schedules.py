@@ -1,8 +1,257 @@
-from typing import Optional, OrderedDict
+import asyncio
+import bisect
+import hashlib
+import json
+import os
+import sys
+from array import array
+from contextvars import ContextVar
+from datetime import date
+from collections.abc import AsyncIterator, Awaitable, Callable, Hashable
+from operator import itemgetter
+from typing import Any, Optional
 
-import requests
+from fastapi import HTTPException
 
+import septum.executor as executor
+import septum.metrics as metrics
+import septum.upstream as upstream
+from septum.cache import TTLCache
 from septum.enums import Direction
+from septum.matrix import MATRIX_ENABLED, MatrixStore, TripMatrix
+from septum.records import Departure, Stop, Trip, intern_id, parse_time
+from septum.shared import SharedFeeds
+
+STOPS_CACHE_TTL = int(os.getenv("STOPS_CACHE_TTL", 3600))
+STOPS_CACHE_MAXSIZE = int(os.getenv("STOPS_CACHE_MAXSIZE", 64))
+SCHEDULES_CACHE_TTL = int(os.getenv("SCHEDULES_CACHE_TTL", 3600))
+SCHEDULES_CACHE_MAXSIZE = int(os.getenv("SCHEDULES_CACHE_MAXSIZE", 512))
+# How long past their TTL stops and schedules are still served while they are refreshed
+STALE_TTL = int(os.getenv("STALE_TTL", 86400))
+
+
+class Unchanged(Exception):
+    """
+    Raised by `ScheduleGenerator._fetch_body` when a feed hasn't changed since the last time it was
+    fetched and the caller still has what it parsed from it
+    """
+
+
+# Set while fetching something that may already be cached: whether to skip the responses shared by
+# other workers and go to septa, and whether the last parse is still around to fall back on
+_refreshing: ContextVar[tuple[bool, bool]] = ContextVar("septum_refreshing", default=(False, False))
+
+
+class StationIndex:
+    """
+    The stops for one line and direction, in order, with lookups by stop name
+    """
+
+    __slots__ = ("stations", "stop_ids", "positions")
+
+    def __init__(self, stations: list[Stop]):
+        self.stations = stations
+        self.stop_ids = {stop.stop_name: stop.stop_id for stop in stations}
+        self.positions: dict[str, int] = {}
+        for position, stop in enumerate(stations):
+            self.positions.setdefault(stop.stop_name, position)
+
+
+class ScheduleColumns:
+    """
+    A schedule.json response stored column by column, with repeated strings interned
+    and arrival times as seconds since midnight
+    """
+
+    __slots__ = (
+        "block_ids",
+        "service_ids",
+        "direction_ids",
+        "release_names",
+        "arrival_times",
+        "service_classes",
+        "recent",
+    )
+
+    FIELDS = itemgetter("block_id", "service_id", "direction_id", "release_name", "arrival_time")
+
+    def __init__(self, raw_schedule: list[dict]):
+        self.service_classes: tuple[list[str], list[str]] | None = None
+        self.recent: dict[tuple[tuple[str, ...], int], list[Departure]] = {}
+        if not raw_schedule:
+            self.block_ids = self.service_ids = self.release_names = ()
+            self.direction_ids = array("b")
+            self.arrival_times = array("i")
+            return
+
+        # One pass over the rows, transposed into a tuple per column
+        block_ids, service_ids, direction_ids, release_names, arrival_times = zip(
+            *map(self.FIELDS, raw_schedule)
+        )
+        self.block_ids = block_ids
+        self.service_ids = tuple(map(sys.intern, service_ids))
+        self.direction_ids = array("b", direction_ids)
+        self.release_names = tuple(map(sys.intern, release_names))
+        # A stop sees the same few hundred times over and over, so each is parsed once
+        seconds = {time: parse_time(time) for time in set(arrival_times)}
+        self.arrival_times = array("i", map(seconds.__getitem__, arrival_times))
+
+    def classify_service_ids(self) -> tuple[list[str], list[str]]:
+        """
+        Works out which service IDs are weekday service and which are weekend service.
+
+        Each service is dated by its newest release, and is weekday-sized if it runs more than half
+        as many trains as the busiest one. Septa can release weekday and weekend service separately,
+        so services are only retired, and ignored, in favour of newer ones of the same size:
+            - Of the weekday-sized services, only those from the newest release are kept. The one
+              with the most trains is weekday service, the rest are weekend service.
+            - Weekend service is everything else, except services that a newer one with at least
+              as many trains has replaced. There can be more than one, e.g. Saturday and Sunday.
+
+        Services running the same number of trains keep the order they first show up in the
+        schedule, so with a tie the first one listed is weekday service.
+
+        The result is worked out once and kept on the columns, so it is redone only when a
+        new schedule is fetched.
+
+        Returns:
+            tuple[list[str], list[str]]: The weekday service IDs and the weekend service IDs.
+        """
+        if self.service_classes is not None:
+            return self.service_classes
+
+        # In the order the services first show up, which breaks ties between them
+        trains: dict[str, set] = {}
+        newest_release: dict[str, str] = {}
+        for block_id, service_id, release_name in zip(
+            self.block_ids, self.service_ids, self.release_names
+        ):
+            trains.setdefault(service_id, set()).add(block_id)
+            if release_name > newest_release.get(service_id, ""):
+                newest_release[service_id] = release_name
+
+        if not trains:
+            self.service_classes = ([], [])
+            return self.service_classes
+
+        def by_trains(service_ids) -> list[str]:
+            return sorted(service_ids, key=lambda service_id: -len(trains[service_id]))
+
+        busiest = max(map(len, trains.values()))
+        weekday_sized = [
+            service_id for service_id in trains if len(trains[service_id]) * 2 > busiest
+        ]
+        newest_weekday = max(newest_release[service_id] for service_id in weekday_sized)
+        weekday = by_trains(
+            service_id
+            for service_id in weekday_sized
+            if newest_release[service_id] == newest_weekday
+        )
+
+        others = weekday[1:] + [
+            service_id for service_id in trains if service_id not in weekday_sized
+        ]
+        weekend = by_trains(
+            service_id
+            for service_id in others
+            if not any(
+                newest_release[other] > newest_release[service_id]
+                and len(trains[other]) >= len(trains[service_id])
+                for other in others
+            )
+        )
+        self.service_classes = (weekday[:1], weekend)
+        return self.service_classes
+
+    def most_recent(self, service_ids: list[str], direction_int: int) -> list[Departure]:
+        """
+        Picks the latest release of each train running on `service_ids` in the given direction.
+
+        Args:
+            service_ids (list[str]): The service IDs to keep.
+            direction_int (int): The direction ID to keep.
+
+        Returns:
+            list[Departure]: The trains, sorted by departure time. The list is worked out once
+                and shared by every caller, so it must not be modified.
+        """
+        key = (tuple(service_ids), direction_int)
+        trains = self.recent.get(key)
+        if trains is not None:
+            return trains
+
+        release_names = self.release_names
+
+        # Assuming release_name implies when the schedule was released
+        # and when it will start applying, we should get the latest one
+        latest: dict[int, int] = {}
+        for row, (service_id, direction_id) in enumerate(zip(self.service_ids, self.direction_ids)):
+            if service_id not in service_ids or direction_id != direction_int:
+                continue
+            block_id = self.block_ids[row]
+            best = latest.get(block_id)
+            if best is None or release_names[row] > release_names[best]:
+                latest[block_id] = row
+
+        trains = [
+            Departure(self.arrival_times[row], intern_id(self.block_ids[row]))
+            for row in latest.values()
+        ]
+        # Only by time, trains leaving at the same time stay in the order septa lists them
+        trains.sort(key=itemgetter(0))
+        self.recent[key] = trains
+        return trains
+
+
+def parse_schedule(body: bytes) -> ScheduleColumns:
+    """
+    Parses a schedule.json response, run through `septum.executor`
+
+    The departures for both services and directions are worked out here too, so requests only
+    ever look them up, and in process mode they come back with the columns.
+    """
+    columns = ScheduleColumns(json.loads(body))
+    for service_ids in columns.classify_service_ids():
+        for direction_int in (0, 1):
+            columns.most_recent(service_ids, direction_int)
+    return columns
+
+
+def join_departures(
+    orig_departures: list[Departure], dest_departures: list[Departure]
+) -> list[Trip]:
+    # The origin's departures are already sorted, so the trips come out sorted too
+    arrivals = {train_id: time for time, train_id in dest_departures}
+    return [
+        Trip(time, arrivals[train_id], train_id)
+        for time, train_id in orig_departures
+        if train_id in arrivals
+    ]
+
+
+def join_services(
+    orig_departures: tuple[list[Departure], list[Departure]],
+    dest_departures: tuple[list[Departure], list[Departure]],
+) -> tuple[list[Trip], list[Trip]]:
+    """
+    Joins the weekday and weekend departures from two stops into trips, run through `septum.executor`
+    """
+    return (
+        join_departures(orig_departures[0], dest_departures[0]),
+        join_departures(orig_departures[1], dest_departures[1]),
+    )
+
+
+def build_matrices(
+    stop_ids: list[str], schedules: list[tuple[list[Departure], list[Departure]]]
+) -> tuple[TripMatrix, TripMatrix]:
+    """
+    Builds the weekday and weekend trip matrices for a line, run through `septum.executor`
+    """
+    return (
+        TripMatrix(stop_ids, [weekday for weekday, _ in schedules]),
+        TripMatrix(stop_ids, [weekend for _, weekend in schedules]),
+    )
 
 
 class ScheduleGenerator:
@@ -23,6 +272,7 @@ class ScheduleGenerator:
         {"line_code": "WIL", "line_name": "Wilmington/Newark"},
         {"line_code": "WTR", "line_name": "West Trenton"},
     ]
+    LINE_CODES = frozenset(line["line_code"] for line in LINES)
     LINES_DIRECTION = {
         "AIR": {"inbound": 0, "outbound": 1},
         "CHE": {"inbound": 1, "outbound": 0},
@@ -39,13 +289,37 @@ class ScheduleGenerator:
         "WTR": {"inbound": 1, "outbound": 0},
     }
 
+    def __init__(self):
+        # Station indexes for both directions of each line,
+        # shared by request validation and schedule building
+        self.stops_cache: TTLCache[dict[int, StationIndex]] = TTLCache(
+            ttl=STOPS_CACHE_TTL, maxsize=STOPS_CACHE_MAXSIZE, stale_ttl=STALE_TTL
+        )
+        # Parsed schedule.json per (line, stop_id)
+        self.schedules_cache: TTLCache[ScheduleColumns] = TTLCache(
+            ttl=SCHEDULES_CACHE_TTL, maxsize=SCHEDULES_CACHE_MAXSIZE, stale_ttl=STALE_TTL
+        )
+        # Content hash of the last response from each upstream URL
+        self.digests: dict[str, str] = {}
+        # The ETag and Last-Modified of the last response from each upstream URL
+        self.validators: dict[str, tuple[str | None, str | None]] = {}
+        # Awaited whenever a line's stops or schedules change upstream, with the line code and the
+        # names of the stops whose schedule changed, or None if the stop list itself did
+        self.change_listeners: list[Callable[[str, frozenset[str] | None], Awaitable[None]]] = []
+        # Precomputed origin-destination trips per (line, direction ID), if opted in
+        self.matrices = MatrixStore() if MATRIX_ENABLED else None
+        if self.matrices is not None:
+            self.change_listeners.append(self._drop_matrices)
+        # Upstream responses shared with other workers, once Redis is hooked up
+        self.feeds = SharedFeeds()
+
     def get_lines(self) -> list[dict[str, str]]:
         """
         Gets the abbreviated for each line supported by the API
         """
         return self.LINES
 
-    def get_stations_for_line(
+    async def get_stations_for_line(
         self, line: str, direction: Optional[Direction] = Direction.INBOUND
     ) -> list[dict[str, str]]:
         """
@@ -61,22 +335,200 @@ class ScheduleGenerator:
         if direction is None:
             direction = Direction.INBOUND
 
-        stops = requests.get(self.STOPS_URL.format(line)).json()
-        direction_int = self.LINES_DIRECTION[line][direction]
+        return [stop.to_dict() for stop in (await self.get_station_index(line, direction)).stations]
+
+    async def get_station_index(
+        self, line: str, direction: Optional[Direction] = Direction.INBOUND
+    ) -> StationIndex:
+        """
+        Retrieves the precomputed station index for a line and direction.
+
+        Args:
+            line (str): The name of the regional rail line (e.g., "TRE").
+            direction (Optional[Direction]): The direction of travel. "inbound" or "outbound"
+
+        Returns:
+            StationIndex: The ordered stops for the line, with lookups by stop name.
+        """
+        if direction is None:
+            direction = Direction.INBOUND
+
+        indexes = await self.stops_cache.get_or_fetch(
+            line, lambda: self._fetch_or_keep(self.stops_cache, line, self._fetch_stops, line)
+        )
+        return indexes[self.LINES_DIRECTION[line][direction]]
+
+    async def _fetch_json(self, line: str, url: str) -> Any:
+        """
+        Fetches `url` and parses it, see `_fetch_body`
+        """
+        body = await self._fetch_body(line, url)
+        with metrics.phase("processing"):
+            return json.loads(body)
+
+    async def _fetch_body(self, line: str, url: str, stop_id: str | None = None) -> bytes:
+        """
+        Fetches `url` and tells the change listeners if it differs from the last time it was fetched
+
+        A response another worker already fetched is used if there is one, unless refreshing.
+        When the caller still has the last parse, septa is asked whether the feed changed, and
+        `Unchanged` is raised if it hasn't, so nothing is parsed again.
+
+        Args:
+            line (str): The line the feed belongs to.
+            url (str): The feed.
+            stop_id (str | None): The stop the feed is the schedule for, None for a stop list.
+        """
+        fresh, keep = _refreshing.get()
+        body = None if fresh else await self.feeds.get(url)
+        if body is None:
+            headers = {}
+            etag, last_modified = self.validators.get(url, (None, None)) if keep else (None, None)
+            if etag is not None:
+                headers["If-None-Match"] = etag
+            if last_modified is not None:
+                headers["If-Modified-Since"] = last_modified
+
+            response = await upstream.get(url, headers=headers)
+            if response.status_code == 304 and keep:
+                raise Unchanged(url)
+            if not response.status_code == 200:
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"Unable to fetch schedule data. The request to {url} returned {response.status_code}",
+                )
+            body = response.content
+            self.validators[url] = (
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified"),
+            )
+            await self.feeds.set(url, body)
 
-        # dict comprehension to ensure uniqueness
-        hash = OrderedDict()
-        for stop in stops:
-            if stop["direction_id"] == direction_int:
-                hash[stop["stop_id"]] = {
-                    "stop_id": str(stop["stop_id"]),
-                    "stop_name": stop["stop_name"],
-                }
+        with metrics.phase("processing"):
+            digest = hashlib.blake2b(body, digest_size=16).hexdigest()
 
-        stops_list = list(hash.values())
-        return stops_list
+        previous = self.digests.get(url)
+        self.digests[url] = digest
+        if previous == digest and keep:
+            raise Unchanged(url)
+        if previous is not None and previous != digest:
+            await self._notify(line, stop_id)
 
-    def get_schedule_for_station(
+        return body
+
+    async def _notify(self, line: str, stop_id: str | None):
+        stations = None
+        if stop_id is not None:
+            # Results are looked up by stop name, a stop ID can have a different name per direction
+            indexes = self.stops_cache.peek(line) or {}
+            stations = frozenset(
+                stop.stop_name
+                for index in indexes.values()
+                for stop in index.stations
+                if stop.stop_id == stop_id
+            )
+        for listener in self.change_listeners:
+            await listener(line, stations)
+
+    async def _fetch_or_keep(
+        self, cache: TTLCache, key: Hashable, fetch: Callable[..., Awaitable], *args, fresh=False
+    ):
+        """
+        Calls `fetch(*args)` for an entry of `cache`, or keeps what's cached if the feed it came
+        from hasn't changed
+        """
+        previous = cache.peek(key)
+        token = _refreshing.set((fresh, previous is not None))
+        try:
+            return await fetch(*args)
+        except Unchanged:
+            return previous
+        finally:
+            _refreshing.reset(token)
+
+    async def _fetch_stops(self, line: str) -> dict[int, StationIndex]:
+        stops = await self._fetch_json(line, self.STOPS_URL.format(line))
+
+        indexes = {}
+        for direction_int in (0, 1):
+            # Keyed by stop ID to ensure uniqueness
+            unique: dict[Any, Stop] = {}
+            for stop in stops:
+                if stop["direction_id"] == direction_int:
+                    unique[stop["stop_id"]] = Stop(intern_id(stop["stop_id"]), stop["stop_name"])
+            indexes[direction_int] = StationIndex(list(unique.values()))
+
+        return indexes
+
+    async def _fetch_schedule(self, line: str, stop_id: str) -> ScheduleColumns:
+        body = await self._fetch_body(line, self.SCHEDULE_URL.format(line, stop_id), stop_id)
+        with metrics.phase("processing"):
+            return await executor.run(parse_schedule, body)
+
+    async def refresh_stops(self, line: str, fresh: bool = True) -> dict[int, StationIndex]:
+        """
+        Fetches the stops for `line` and replaces the cached station indexes with them
+
+        With `fresh` set they come from septa, otherwise from another worker if it has them.
+        If they haven't changed, the cached indexes are kept as they are.
+        """
+        indexes = await self._fetch_or_keep(
+            self.stops_cache, line, self._fetch_stops, line, fresh=fresh
+        )
+        self.stops_cache.set(line, indexes)
+        return indexes
+
+    async def refresh_schedule(
+        self, line: str, stop_id: str, fresh: bool = True
+    ) -> ScheduleColumns:
+        """
+        Fetches the schedule for a stop and replaces the cached one with it
+
+        With `fresh` set it comes from septa, otherwise from another worker if it has it.
+        If it hasn't changed, the cached schedule is kept as it is.
+        """
+        columns = await self._fetch_or_keep(
+            self.schedules_cache, (line, stop_id), self._fetch_schedule, line, stop_id, fresh=fresh
+        )
+        self.schedules_cache.set((line, stop_id), columns)
+        return columns
+
+    def get_service_ids(
+        self, columns: ScheduleColumns, day: date | None = None
+    ) -> tuple[list[str], list[str]]:
+        """
+        Gets the service IDs used for weekday and weekend trains in a stop's schedule.
+
+        Args:
+            columns (ScheduleColumns): The stop's schedule.
+            day (date | None): The day of travel, today if None. Septa's schedules don't say which
+                days a service runs on, so it only matters to subclasses that do know, like the
+                GTFS backend.
+
+        Returns:
+            tuple[list[str], list[str]]: The weekday service IDs and the weekend service IDs.
+        """
+        # Septa rotates service IDs with every schedule change,
+        # so they are worked out from the data rather than hardcoded
+        return columns.classify_service_ids()
+
+    def service_period(self, day: date | None = None) -> Hashable:
+        """
+        Identifies which services `get_service_ids` picks on `day`, so trip matrices built for one
+        day are only reused on days with the same services. They don't depend on the day here.
+        """
+        return None
+
+    @staticmethod
+    def _as_output(
+        weekday: list[Departure] | list[Trip], weekend: list[Departure] | list[Trip]
+    ) -> dict[str, list[dict[str, str]]]:
+        return {
+            "weekday": [train.to_dict() for train in weekday],
+            "weekend": [train.to_dict() for train in weekend],
+        }
+
+    async def get_schedule_for_station(
         self, line: str, orig: str, direction: Direction
     ) -> dict[str, list[dict[str, str]]]:
         """
@@ -94,48 +546,81 @@ class ScheduleGenerator:
                 - "departure_time": The time at which the train departs from the specified stop.
         """
 
-        stop_codes = [
-            stop
-            for stop in self.get_stations_for_line(line, direction)
-            if (stop["stop_name"] == orig)
-        ]
-        stop_dict = {stop["stop_name"]: stop["stop_id"] for stop in stop_codes}
-        raw_schedule = requests.get(self.SCHEDULE_URL.format(line, stop_dict[orig])).json()
+        index = await self.get_station_index(line, direction)
+        return self._as_output(*await self._get_departures(line, index.stop_ids[orig], direction))
+
+    async def _get_departures(
+        self, line: str, stop_id: str, direction: Direction, day: date | None = None
+    ) -> tuple[list[Departure], list[Departure]]:
+        """
+        Fetches and processes the schedule for a stop ID, see `get_schedule_for_station`
+
+        Returns:
+            tuple[list[Departure], list[Departure]]: The weekday and the weekend departures.
+        """
+        key = (line, stop_id)
+        columns = await self.schedules_cache.get_or_fetch(
+            key,
+            lambda: self._fetch_or_keep(
+                self.schedules_cache, key, self._fetch_schedule, line, stop_id
+            ),
+        )
+        if not columns.block_ids:
+            # Don't hold on to an empty schedule, it's most likely an upstream hiccup
+            self.schedules_cache.invalidate(key)
         direction_int = self.LINES_DIRECTION[line][direction]
+        with metrics.phase("processing"):
+            weekday, weekend = self.get_service_ids(columns, day)
+            return (
+                columns.most_recent(weekday, direction_int),
+                columns.most_recent(weekend, direction_int),
+            )
+
+    @staticmethod
+    def is_weekend(day: date) -> bool:
+        """
+        Whether weekend service runs on `day`
+        """
+        return day.weekday() >= 5
 
-        # First one is for weekdays, second one is for weekends
-        # This has already changed before, and will likely change
-        # again, but so far, I can't think of a reliable way to
-        # to tell which one is which
-
-        # Lists because sometimes weekend times have two service_ids associated with them
-        service_ids = (["SID185189"], ["SID185186"])
-        sorted_trains = []
-
-        for service_id in service_ids:
-            trains = [
-                train
-                for train in raw_schedule
-                if (train["service_id"] in service_id and train["direction_id"] == direction_int)
-            ]
-            train_ids = set(train["block_id"] for train in trains)
-
-            # Assuming release_name implies when the schedule was released
-            # and when it will start applying, we should get the latest one
-            most_recent = []
-            for train_id in train_ids:
-                same_train_id = [train for train in trains if train["block_id"] == train_id]
-                most_recent.append(max(same_train_id, key=lambda x: x["release_name"]))
-
-            most_recent = [
-                {"train_id": str(train["block_id"]), "departure_time": train["arrival_time"]}
-                for train in most_recent
-            ]
-            sorted_trains.append(sorted(most_recent, key=lambda x: x["departure_time"]))
-
-        return {"weekday": sorted_trains[0], "weekend": sorted_trains[1]}
-
-    def get_schedule_for_line(
+    async def get_next_departures(
+        self,
+        line: str,
+        orig: str,
+        dest: Optional[str],
+        direction: Direction,
+        day: date,
+        after: str,
+        count: int,
+    ) -> list[dict[str, str]]:
+        """
+        Retrieves the next few trains leaving a stop on a given day, optionally going to a second stop.
+
+        Args:
+            line (str): The name of the train line (e.g., "TRE").
+            orig (str): The name of the origin stop (e.g., "Trenton").
+            dest (Optional[str]): The name of the destination stop, if any.
+            direction (Direction): The direction of travel. "inbound" or "outbound"
+            day (date): The day of travel, which picks weekday or weekend service.
+            after (str): Only trains leaving at or after this time are included, as "HH:MM:SS".
+            count (int): The most trains to return.
+
+        Returns:
+            list[dict[str, str]]: Up to `count` trains in the same format as `get_schedule_for_station`,
+            or `get_schedule_for_line` if `dest` is passed in, sorted by departure time.
+        """
+        if dest is None:
+            index = await self.get_station_index(line, direction)
+            services = await self._get_departures(line, index.stop_ids[orig], direction, day)
+        else:
+            services = await self._get_trips(line, orig, dest, direction, day)
+
+        trains = services[1 if self.is_weekend(day) else 0]
+        # The lists are already sorted by departure time, so the first train can be found by bisection
+        start = bisect.bisect_left(trains, parse_time(after), key=itemgetter(0))
+        return [train.to_dict() for train in trains[start : start + count]]
+
+    async def get_schedule_for_line(
         self, line: str, orig: str, dest: str, direction: Direction
     ) -> dict[str, list[dict[str, str]]]:
         """
@@ -154,36 +639,116 @@ class ScheduleGenerator:
                 - "departure_time": The departure time from the origin stop.
                 - "arrival_time": The arrival time at the destination stop.
         """
+        return self._as_output(*await self._get_trips(line, orig, dest, direction))
+
+    async def _get_trips(
+        self, line: str, orig: str, dest: str, direction: Direction, day: date | None = None
+    ) -> tuple[list[Trip], list[Trip]]:
+        """
+        Works out the trips between two stops, see `get_schedule_for_line`
+
+        Returns:
+            tuple[list[Trip], list[Trip]]: The weekday and the weekend trips.
+        """
+
+        # Both stops come from the same stop list, so fetch it once and
+        # then fetch the two station schedules at the same time
+        index = await self.get_station_index(line, direction)
+
+        if self.matrices is not None:
+            weekday, weekend = await self.get_trip_matrices(line, direction, day)
+            orig_id, dest_id = index.stop_ids[orig], index.stop_ids[dest]
+            return weekday.trips(orig_id, dest_id), weekend.trips(orig_id, dest_id)
+
+        orig_departures, dest_departures = await asyncio.gather(
+            self._get_departures(line, index.stop_ids[orig], direction, day),
+            self._get_departures(line, index.stop_ids[dest], direction, day),
+        )
+        with metrics.phase("processing"):
+            return await executor.run(join_services, orig_departures, dest_departures)
+
+    async def get_schedules_for_stations(
+        self, line: str, direction: Direction, stations: Optional[list[str]] = None
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Retrieves the schedule for every stop on a line, or for some of its stops, in one go.
+
+        The stop list is fetched once, and then every stop's schedule is fetched at the same time.
+        This returns once every fetch has finished, so a bad line, an unreachable stop list or a
+        stop whose schedule can't be fetched is raised here rather than part way through reading
+        the results. The first stop to fail cancels the rest.
+
+        Args:
+            line (str): The name of the train line (e.g., "TRE").
+            direction (Direction): The direction of travel. "inbound" or "outbound"
+            stations (Optional[list[str]]): The stop names to include, all of the line's stops if None.
+
+        Returns:
+            AsyncIterator[dict[str, Any]]: One dictionary per stop, in the order the line runs, with
+            "stop_id", "stop_name", and "weekday" and "weekend" lists like `get_schedule_for_station`.
+        """
+        index = await self.get_station_index(line, direction)
+        stops = index.stations
+        if stations is not None:
+            wanted = set(stations)
+            stops = [stop for stop in stops if stop.stop_name in wanted]
+
+        tasks = [
+            asyncio.ensure_future(self._get_departures(line, stop.stop_id, direction))
+            for stop in stops
+        ]
+        try:
+            if tasks:
+                await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in tasks:
+                if task.done() and not task.cancelled() and task.exception() is not None:
+                    raise task.exception()
+        finally:
+            # Stop fetching after a failure, or for a caller that has gone away
+            for task in tasks:
+                task.cancel()
+
+        async def schedules() -> AsyncIterator[dict[str, Any]]:
+            for stop, task in zip(stops, tasks):
+                yield {**stop.to_dict(), **self._as_output(*task.result())}
+
+        return schedules()
+
+    async def get_trip_matrices(
+        self, line: str, direction: Direction, day: date | None = None
+    ) -> tuple[TripMatrix, TripMatrix]:
+        """
+        Gets the weekday and weekend trip matrices for a line and direction, building them if needed.
+
+        Building one needs the schedule for every stop on the line. Matrices are kept until the first
+        of those schedules expires or the line changes upstream, as long as they fit in
+        MATRIX_MEMORY_BUDGET. Once they expire, they are rebuilt from the refreshed schedules.
+        """
+        direction_int = self.LINES_DIRECTION[line][direction]
+        key = (line, direction_int, self.service_period(day))
+        matrices = None if self.matrices is None else self.matrices.get(key)
+        if matrices is not None:
+            return matrices
+
+        index = await self.get_station_index(line, direction)
+        stop_ids = [stop.stop_id for stop in index.stations]
+        schedules = await asyncio.gather(
+            *(self._get_departures(line, stop_id, direction, day) for stop_id in stop_ids)
+        )
+        with metrics.phase("processing"):
+            matrices = await executor.run(build_matrices, stop_ids, schedules)
+
+        # A stop with no trains at all is most likely an upstream hiccup, so don't keep it around
+        complete = all(weekday or weekend for weekday, weekend in schedules)
+        if self.matrices is not None and complete:
+            # A stale schedule is being refreshed in the background, so rebuild once it has been
+            ttl = min(
+                (self.schedules_cache.ttl_left((line, stop_id)) or 0 for stop_id in stop_ids),
+                default=0,
+            )
+            self.matrices.set(key, matrices, ttl)
+        return matrices
 
-        def flatten_schedule(orig_schedule, dest_schedule):
-            orig_flattened = {
-                train["train_id"]: {k: v for k, v in train.items() if k != "train_id"}
-                for train in orig_schedule
-            }
-            dest_flattened = {
-                train["train_id"]: {k: v for k, v in train.items() if k != "train_id"}
-                for train in dest_schedule
-            }
-
-            orig_keys = list(orig_flattened.keys())
-            for key in orig_keys:
-                if key not in dest_flattened.keys():
-                    orig_flattened.pop(key)
-
-            schedule = [
-                {
-                    "train_id": str(k),
-                    "departure_time": v["departure_time"],
-                    "arrival_time": dest_flattened[k]["departure_time"],
-                }
-                for k, v in orig_flattened.items()
-            ]
-            return sorted(schedule, key=lambda x: x["departure_time"])
-
-        orig_schedule = self.get_schedule_for_station(line, orig, direction)
-        dest_schedule = self.get_schedule_for_station(line, dest, direction)
-
-        weekday_schedule = flatten_schedule(orig_schedule["weekday"], dest_schedule["weekday"])
-        weekend_schedule = flatten_schedule(orig_schedule["weekend"], dest_schedule["weekend"])
-
-        return {"weekday": weekday_schedule, "weekend": weekend_schedule}
+    async def _drop_matrices(self, line: str, stations: frozenset[str] | None):
+        # Every matrix covers every stop on the line
+        self.matrices.invalidate_line(line)
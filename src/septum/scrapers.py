@@ -1,35 +1,88 @@
-import requests
-from bs4 import BeautifulSoup
+import logging
+import os
+from collections.abc import Awaitable, Callable
+from typing import Any
+
 from fastapi import HTTPException
 
+import septum.tables as tables
+import septum.upstream as upstream
+from septum.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
 STATION_NAMES_URL = "https://www3.septa.org/VIRegionalRail.html"
 BUS_AND_TROLLEY_ROUTES_URL = "https://www3.septa.org/VIBusAndTrolley.html"
 
+# Which septum.tables backend reads the scraped pages
+SCRAPER_PARSER = os.getenv("SCRAPER_PARSER", "soup")
+extract_tables = tables.get_backend(SCRAPER_PARSER)
+
+# How long a parsed page is used before asking septa whether it changed
+PAGE_REVALIDATE_AFTER = int(os.getenv("PAGE_REVALIDATE_AFTER", 60))
+# How long past that the last parse is still served while the page is refetched
+PAGE_STALE_TTL = int(os.getenv("PAGE_STALE_TTL", 604800))
+
+# The last parse of each page, with the ETag and Last-Modified it came with
+_parsed_pages: dict[str, tuple[str | None, str | None, Any]] = {}
+# Awaited with a page's URL whenever what's parsed from it changes
+change_listeners: list[Callable[[str], Awaitable[None]]] = []
+_recent_pages: TTLCache[Any] = TTLCache(
+    ttl=PAGE_REVALIDATE_AFTER, maxsize=8, stale_ttl=PAGE_STALE_TTL
+)
+
 
-def get_station_names() -> list[dict[str, str]]:
+async def _get_parsed_page(url: str, name: str, parse: Callable[[bytes], Any]) -> Any:
     """
-    Scrapes STATION_NAMES_URL to get the inputs used by `/NextToArrive/index.php`
+    Fetches and parses `url`, reusing the last parse if septa says the page hasn't changed.
 
-    Returns:
-        A list of dictionaries where `station_name` is the colloquial station name and
-            `parameter` is what the API expects as input for the particular station.
+    Concurrent callers share one request, and a page parsed in the last PAGE_REVALIDATE_AFTER
+    seconds is reused without asking at all. After that, the last parse is still served for up to
+    PAGE_STALE_TTL seconds while the page is fetched again in the background.
+
+    Args:
+        url (str): The page to fetch.
+        name (str): What the page holds, for error messages (e.g., "station names").
+        parse (Callable[[bytes], Any]): Turns the page's content into the result.
     """
-    page = requests.get(STATION_NAMES_URL)
-
-    if not page.status_code == 200:
-        raise HTTPException(
-            status_code=503,
-            detail=f"Unable to fetch station names. The request to {STATION_NAMES_URL} returned {page.status_code}",
-        )
-    soup = BeautifulSoup(page.content, "html.parser")
-    tables = soup.find_all("table")
-    stations = []
 
-    for table in tables:
-        rows = table.find_all("tr")[1:]
-        for row in rows:
-            cells = [cell.get_text() for cell in row.find_all("td")]
+    async def fetch() -> Any:
+        headers = {}
+        previous = _parsed_pages.get(url)
+        if previous is not None:
+            etag, last_modified, _ = previous
+            if etag is not None:
+                headers["If-None-Match"] = etag
+            if last_modified is not None:
+                headers["If-Modified-Since"] = last_modified
+
+        page = await upstream.get(url, headers=headers)
+
+        if page.status_code == 304 and previous is not None:
+            return previous[2]
+        if not page.status_code == 200:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Unable to fetch {name}. The request to {url} returned {page.status_code}",
+            )
+
+        parsed = parse(page.content)
+        _parsed_pages[url] = (page.headers.get("ETag"), page.headers.get("Last-Modified"), parsed)
+        # Pages can change without what's parsed from them changing, e.g. a timestamp in a footer
+        if previous is not None and previous[2] != parsed:
+            for listener in change_listeners:
+                await listener(url)
+        return parsed
+
+    return await _recent_pages.get_or_fetch(url, fetch)
+
+
+def _parse_station_names(content: bytes) -> list[dict[str, str]]:
+    stations = []
 
+    for table in extract_tables(content):
+        rows = table[1:]
+        for cells in rows:
             name = cells[0].strip()
             parameter = cells[1].strip()
 
@@ -42,7 +95,48 @@ def get_station_names() -> list[dict[str, str]]:
     return stations
 
 
-def get_bus_routes() -> list[dict[str, str]]:
+def _parse_bus_and_trolley_routes(
+    content: bytes,
+) -> tuple[list[dict[str, str]], list[dict[str, str]]]:
+    routes = []
+
+    for table in extract_tables(content):
+        table_routes = []
+        rows = table[1:]
+        for cells in rows:
+            table_routes.append({"route_number": cells[0].strip(), "route_name": cells[1].strip()})
+        routes.append(table_routes)
+
+    # The last one is trolleys
+    bus_routes = [route for table in routes[:-1] for route in table]
+    trolley_routes = routes[-1]
+    return bus_routes, trolley_routes
+
+
+async def get_station_names() -> list[dict[str, str]]:
+    """
+    Scrapes STATION_NAMES_URL to get the inputs used by `/NextToArrive/index.php`
+
+    Returns:
+        A list of dictionaries where `station_name` is the colloquial station name and
+            `parameter` is what the API expects as input for the particular station.
+    """
+    return await _get_parsed_page(STATION_NAMES_URL, "station names", _parse_station_names)
+
+
+async def get_bus_and_trolley_routes() -> tuple[list[dict[str, str]], list[dict[str, str]]]:
+    """
+    Scrapes BUS_AND_TROLLEY_ROUTES_URL once for both the bus and the trolley routes
+
+    Returns:
+        A tuple of the bus routes and the trolley routes, see `get_bus_routes` and `get_trolley_routes`
+    """
+    return await _get_parsed_page(
+        BUS_AND_TROLLEY_ROUTES_URL, "bus and trolley routes", _parse_bus_and_trolley_routes
+    )
+
+
+async def get_bus_routes() -> list[dict[str, str]]:
     """
     Scrapes BUS_AND_TROLLEY_ROUTES_URL to get inputs used by `/TransitView/index.php`
 
@@ -50,27 +144,11 @@ def get_bus_routes() -> list[dict[str, str]]:
         A list of dictionaries where `route_name` is the colloquial name of a given bus route,
             and `route_number` (not always a "number") is what the API expects.
     """
-    page = requests.get(BUS_AND_TROLLEY_ROUTES_URL)
-
-    if not page.status_code == 200:
-        raise HTTPException(
-            status_code=503,
-            detail=f"Unable to fetch bus routes. The request to {BUS_AND_TROLLEY_ROUTES_URL} returned {page.status_code}",
-        )
-    soup = BeautifulSoup(page.content, "html.parser")
-    tables = soup.find_all("table")[:-1]  # The last one is trolleys
-    routes = []
-
-    for table in tables:
-        rows = table.find_all("tr")[1:]
-        for row in rows:
-            cells = [cell.get_text() for cell in row.find_all("td")]
-            routes.append({"route_number": cells[0].strip(), "route_name": cells[1].strip()})
+    bus_routes, _ = await get_bus_and_trolley_routes()
+    return bus_routes
 
-    return routes
 
-
-def get_trolley_routes() -> list[dict[str, str]]:
+async def get_trolley_routes() -> list[dict[str, str]]:
     """
     Scrapes BUS_AND_TROLLEY_ROUTES_URL to get inputs used by `/TransitView/index.php`
 
@@ -78,21 +156,23 @@ def get_trolley_routes() -> list[dict[str, str]]:
         A list of dictionaries where `route_name` is the colloquial name of a given trolley route,
             and `route_number` is what the API expects.
     """
-    page = requests.get(BUS_AND_TROLLEY_ROUTES_URL)
-
-    if not page.status_code == 200:
-        raise HTTPException(
-            status_code=503,
-            detail=f"Unable to fetch trolley routes. The request to {BUS_AND_TROLLEY_ROUTES_URL} returned {page.status_code}",
-        )
-    soup = BeautifulSoup(page.content, "html.parser")
-    tables = soup.find_all("table")
-    routes = []
+    _, trolley_routes = await get_bus_and_trolley_routes()
+    return trolley_routes
 
-    # The last one is trolleys
-    rows = tables[-1].find_all("tr")[1:]
-    for row in rows:
-        cells = [cell.get_text() for cell in row.find_all("td")]
-        routes.append({"route_number": cells[0].strip(), "route_name": cells[1].strip()})
 
-    return routes
+async def refresh_pages():
+    """
+    Asks septa whether any page scraped so far changed since it was last fetched, without waiting
+    for PAGE_REVALIDATE_AFTER. The change listeners hear about every page whose parse changed.
+    """
+    for url, refresh in (
+        (STATION_NAMES_URL, get_station_names),
+        (BUS_AND_TROLLEY_ROUTES_URL, get_bus_and_trolley_routes),
+    ):
+        if url not in _parsed_pages:
+            continue
+        _recent_pages.invalidate(url)
+        try:
+            await refresh()
+        except HTTPException as err:
+            logger.warning("Unable to refresh %s: %s", url, err.detail)
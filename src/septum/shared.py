@@ -0,0 +1,100 @@
+"""
+Upstream responses shared between workers and replicas through Redis.
+
+With several workers, each one keeps its own parsed stops and schedules, but they are parsed
+from the same response bodies. Whichever worker fetches a feed from septa first stores its body
+here, and the rest read it from Redis instead of going upstream themselves. Only one worker, the
+leader, runs the periodic warm-up against septa. The others warm up from what it stored.
+"""
+
+import logging
+import os
+import socket
+import time
+
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+import septum.backend as backend
+
+logger = logging.getLogger(__name__)
+
+# How long a stored response is handed out before workers go back to septa for it themselves
+SHARED_FEEDS_TTL = int(os.getenv("SHARED_FEEDS_TTL", 1800))
+
+
+class SharedFeeds:
+    """
+    Stores upstream response bodies in Redis, keyed by URL.
+
+    Until `redis` is set, nothing is shared: lookups miss and this worker is always the leader,
+    which is how a single worker behaves.
+    """
+
+    PREFIX = "septum-feeds"
+
+    def __init__(self, ttl: int = SHARED_FEEDS_TTL):
+        self.ttl = ttl
+        self.redis: aioredis.Redis | None = None
+        # Identifies this worker when it holds a lease
+        self.token = f"{socket.gethostname()}:{os.getpid()}"
+
+    async def get(self, url: str) -> bytes | None:
+        if self.redis is None:
+            return None
+        try:
+            return backend.decompress(await self.redis.get(f"{self.PREFIX}:{url}"))
+        except (RedisError, OSError) as err:
+            logger.warning("Shared feed lookup for %s failed: %r", url, err)
+            return None
+
+    async def set(self, url: str, body: bytes):
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(f"{self.PREFIX}:{url}", backend.compress(body), ex=self.ttl)
+        except (RedisError, OSError) as err:
+            logger.warning("Shared feed store for %s failed: %r", url, err)
+
+    async def lead(self, name: str, ttl: int) -> bool:
+        """
+        Takes or renews the `name` lease for `ttl` seconds, returning whether this worker holds it
+
+        If Redis can't be reached, every worker leads, like they would without Redis.
+        """
+        if self.redis is None:
+            return True
+        key = f"{self.PREFIX}-lease:{name}"
+        try:
+            if await self.redis.set(key, self.token, nx=True, ex=ttl):
+                return True
+            if await self.redis.get(key) == self.token.encode():
+                await self.redis.expire(key, ttl)
+                return True
+            return False
+        except (RedisError, OSError) as err:
+            logger.warning("Unable to take the %s lease: %r", name, err)
+            return True
+
+    async def mark(self, name: str, ttl: int):
+        """
+        Records that `name` just happened, e.g. that the leader finished warming up
+        """
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(f"{self.PREFIX}-mark:{name}", time.time(), ex=ttl)
+        except (RedisError, OSError) as err:
+            logger.warning("Unable to mark %s: %r", name, err)
+
+    async def marked(self, name: str) -> bool:
+        """
+        Whether any worker called `mark(name, ttl)` in the last `ttl` seconds
+        """
+        if self.redis is None:
+            return True
+        try:
+            return bool(await self.redis.exists(f"{self.PREFIX}-mark:{name}"))
+        except (RedisError, OSError) as err:
+            logger.warning("Unable to check %s: %r", name, err)
+            return True
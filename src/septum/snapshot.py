@@ -0,0 +1,148 @@
+"""
+Saves what a ScheduleGenerator has parsed to disk, so a restarted process can serve right away.
+
+A snapshot holds the station indexes, the parsed schedules and the upstream digests and
+validators, along with how long each entry had left. Entries are loaded with that time, less however long the snapshot
+sat on disk. Entries that ran out in the meantime are still served, and refreshed in the
+background the first time they're asked for, like any other stale entry.
+
+The file is a header followed by the compressed pickle. The header holds SNAPSHOT_VERSION,
+which is bumped whenever the pickled classes change shape, so an older snapshot is ignored
+rather than loaded wrong.
+"""
+
+import asyncio
+import logging
+import os
+import pickle
+import time
+import zlib
+from pathlib import Path
+
+from septum.schedules import ScheduleGenerator
+
+logger = logging.getLogger(__name__)
+
+# Where to keep the snapshot, no snapshot is loaded or saved if it isn't set
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH")
+SNAPSHOT_INTERVAL = int(os.getenv("SNAPSHOT_INTERVAL", 600))
+
+MAGIC = b"SEPTUM"
+SNAPSHOT_VERSION = 1
+
+
+def _pickle(schedule: ScheduleGenerator) -> bytes:
+    payload = {
+        "saved_at": time.time(),
+        "stops": schedule.stops_cache.items_with_ttl(),
+        "schedules": schedule.schedules_cache.items_with_ttl(),
+        "digests": dict(schedule.digests),
+        "validators": dict(schedule.validators),
+    }
+    return pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _pack(data: bytes) -> bytes:
+    return MAGIC + SNAPSHOT_VERSION.to_bytes(2, "big") + zlib.compress(data)
+
+
+def dumps(schedule: ScheduleGenerator) -> bytes:
+    """
+    The generator's caches as a snapshot, see `loads`
+    """
+    return _pack(_pickle(schedule))
+
+
+def loads(schedule: ScheduleGenerator, snapshot: bytes) -> int:
+    """
+    Fills the generator's caches from a snapshot made by `dumps`.
+
+    Returns:
+        int: How many entries were loaded.
+
+    Raises:
+        ValueError: If `snapshot` isn't a snapshot, or is one from another SNAPSHOT_VERSION.
+    """
+    header = MAGIC + SNAPSHOT_VERSION.to_bytes(2, "big")
+    if not snapshot.startswith(header):
+        raise ValueError("Not a snapshot from this version of septum")
+    payload = pickle.loads(zlib.decompress(snapshot[len(header) :]))
+
+    age = max(0.0, time.time() - payload["saved_at"])
+    loaded = 0
+    for cache, entries in (
+        (schedule.stops_cache, payload["stops"]),
+        (schedule.schedules_cache, payload["schedules"]),
+    ):
+        for key, seconds_left, value in entries:
+            # Too old to even be served stale
+            if seconds_left - age + cache.stale_ttl <= 0:
+                continue
+            cache.set(key, value, ttl=seconds_left - age)
+            loaded += 1
+
+    for url, digest in payload["digests"].items():
+        schedule.digests.setdefault(url, digest)
+    for url, validators in payload.get("validators", {}).items():
+        schedule.validators.setdefault(url, validators)
+    return loaded
+
+
+def load(schedule: ScheduleGenerator, path: str | Path) -> int:
+    """
+    Loads the snapshot at `path`, if there is a usable one
+
+    Returns:
+        int: How many entries were loaded, 0 if there was no usable snapshot.
+    """
+    try:
+        snapshot = Path(path).read_bytes()
+    except FileNotFoundError:
+        return 0
+    try:
+        loaded = loads(schedule, snapshot)
+    except Exception as err:
+        # A broken or outdated snapshot only costs a cold start
+        logger.warning("Ignoring the snapshot at %s: %r", path, err)
+        return 0
+    logger.info("Loaded %d entries from the snapshot at %s", loaded, path)
+    return loaded
+
+
+def _write(path: Path, data: bytes) -> int:
+    snapshot = _pack(data)
+    # Written next to the old one and swapped in, so a crash never leaves half a snapshot
+    temporary = path.with_name(f".{path.name}.{os.getpid()}")
+    temporary.write_bytes(snapshot)
+    os.replace(temporary, path)
+    return len(snapshot)
+
+
+async def save(schedule: ScheduleGenerator, path: str | Path):
+    """
+    Saves the generator's caches to `path`
+
+    The caches are pickled on the event loop, so nothing changes under the pickler, and
+    compressed and written out in a thread. Failing to write it is logged, the previous snapshot
+    is left as it was.
+    """
+    path = Path(path)
+    data = _pickle(schedule)
+    try:
+        size = await asyncio.to_thread(_write, path, data)
+    except OSError as err:
+        logger.warning("Unable to save a snapshot to %s: %r", path, err)
+        return
+    logger.info("Saved a %d KiB snapshot to %s", size // 1024, path)
+
+
+async def run(schedule: ScheduleGenerator, path: str | Path, interval: int = SNAPSHOT_INTERVAL):
+    """
+    Saves a snapshot every `interval` seconds
+
+    With several workers, only the one holding the snapshot lease writes it.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        if await schedule.feeds.lead("snapshot", ttl=interval * 2):
+            await save(schedule, path)
@@ -0,0 +1,123 @@
+"""
+Pulls the text out of every table on a page, with a choice of HTML parser.
+
+Every backend returns the same shape: a list of tables, each a list of its rows (`tr`), each a
+list of the text in that row's cells (`td`), unstripped. Like BeautifulSoup's `find_all`, a
+table's rows and a row's cells include those of anything nested inside it.
+
+The parsers are imported the first time a page is parsed, not when this module is.
+
+Backends:
+    soup: BeautifulSoup with "html.parser", builds a full tree.
+    stream: The standard library's HTMLParser, collects cells as they stream past without a tree.
+    lxml: lxml's C parser. Needs the `lxml` package.
+    selectolax: selectolax's C parser. Needs the `selectolax` package.
+"""
+
+from collections.abc import Callable
+from html.parser import HTMLParser
+
+Tables = list[list[list[str]]]
+
+
+def soup_tables(content: bytes) -> Tables:
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(content, "html.parser")
+    return [
+        [[cell.get_text() for cell in row.find_all("td")] for row in table.find_all("tr")]
+        for table in soup.find_all("table")
+    ]
+
+
+class _TableStream(HTMLParser):
+    TRACKED = ("table", "tr", "td")
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tables: list[list[list[list[str]]]] = []
+        # Open table/tr/td elements, innermost last
+        self.stack: list[tuple[str, list]] = []
+
+    def _open(self, tag: str) -> list[list]:
+        return [element for name, element in self.stack if name == tag]
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in self.TRACKED:
+            return
+
+        element: list = []
+        if tag == "table":
+            self.tables.append(element)
+        elif tag == "tr":
+            for table in self._open("table"):
+                table.append(element)
+        else:
+            for row in self._open("tr"):
+                row.append(element)
+        self.stack.append((tag, element))
+
+    def handle_endtag(self, tag):
+        # Closing a tag also closes anything still open inside it, like BeautifulSoup does
+        for position in range(len(self.stack) - 1, -1, -1):
+            if self.stack[position][0] == tag:
+                del self.stack[position:]
+                return
+
+    def handle_data(self, data):
+        for cell in self._open("td"):
+            cell.append(data)
+
+
+def stream_tables(content: bytes) -> Tables:
+    from bs4.dammit import UnicodeDammit
+
+    parser = _TableStream()
+    parser.feed(UnicodeDammit(content, is_html=True).unicode_markup or "")
+    parser.close()
+    return [[["".join(cell) for cell in row] for row in table] for table in parser.tables]
+
+
+def lxml_tables(content: bytes) -> Tables:
+    import lxml.html
+
+    document = lxml.html.document_fromstring(content)
+    return [
+        [[cell.text_content() for cell in row.iter("td")] for row in table.iter("tr")]
+        for table in document.iter("table")
+    ]
+
+
+def selectolax_tables(content: bytes) -> Tables:
+    from selectolax.lexbor import LexborHTMLParser
+
+    document = LexborHTMLParser(content)
+    return [
+        [[cell.text(deep=True) for cell in row.css("td")] for row in table.css("tr")]
+        for table in document.css("table")
+    ]
+
+
+BACKENDS: dict[str, Callable[[bytes], Tables]] = {
+    "soup": soup_tables,
+    "stream": stream_tables,
+    "lxml": lxml_tables,
+    "selectolax": selectolax_tables,
+}
+
+OPTIONAL_PACKAGES = {"lxml": "lxml.html", "selectolax": "selectolax.lexbor"}
+
+
+def get_backend(name: str) -> Callable[[bytes], Tables]:
+    """
+    Looks up a backend by name, making sure its parser is installed.
+
+    Raises:
+        ValueError: If there is no backend called `name`.
+        ImportError: If the backend's parser package is not installed.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown HTML parser backend: {name}, expected one of {list(BACKENDS)}")
+    if name in OPTIONAL_PACKAGES:
+        __import__(OPTIONAL_PACKAGES[name])
+    return BACKENDS[name]
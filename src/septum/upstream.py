@@ -0,0 +1,201 @@
+import asyncio
+import os
+import time
+import weakref
+
+import httpx
+from fastapi import HTTPException
+
+import septum.metrics as metrics
+
+UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", 10))
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", 5))
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", 50))
+UPSTREAM_MAX_KEEPALIVE = int(os.getenv("UPSTREAM_MAX_KEEPALIVE", 20))
+UPSTREAM_MAX_PER_HOST = int(os.getenv("UPSTREAM_MAX_PER_HOST", 10))
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", 30))
+# Upper bound on waiting for one of a host's UPSTREAM_MAX_PER_HOST slots, and then separately on
+# the request itself, including time spent waiting for a connection in the pool
+UPSTREAM_DEADLINE = float(os.getenv("UPSTREAM_DEADLINE", 15))
+UPSTREAM_BREAKER_THRESHOLD = int(os.getenv("UPSTREAM_BREAKER_THRESHOLD", 5))
+UPSTREAM_BREAKER_BACKOFF = float(os.getenv("UPSTREAM_BREAKER_BACKOFF", 5))
+UPSTREAM_BREAKER_MAX_BACKOFF = float(os.getenv("UPSTREAM_BREAKER_MAX_BACKOFF", 300))
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a host after it fails `threshold` times in a row.
+
+    While open, requests fail right away. Once the backoff runs out a single trial request is let
+    through: if it works the breaker closes, otherwise it opens again with the backoff doubled,
+    up to `max_backoff` seconds.
+    """
+
+    def __init__(self, threshold: int, backoff: float, max_backoff: float):
+        self.threshold = threshold
+        self.base_backoff = backoff
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self.open_until = 0.0
+        self.trial_in_flight = False
+
+    def allow(self) -> bool:
+        """
+        Returns whether a request may be sent right now.
+        """
+        if self.failures < self.threshold:
+            return True
+        if self.trial_in_flight or time.monotonic() < self.open_until:
+            return False
+        self.trial_in_flight = True
+        return True
+
+    def retry_in(self) -> float:
+        return max(0.0, self.open_until - time.monotonic())
+
+    def record_success(self):
+        self.failures = 0
+        self.backoff = self.base_backoff
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.failures >= self.threshold:
+            self.open_until = time.monotonic() + self.backoff
+            self.backoff = min(self.backoff * 2, self.max_backoff)
+
+
+# Breakers only hold plain state, so unlike clients they are shared by every event loop
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(host: str) -> CircuitBreaker:
+    breaker = _breakers.get(host)
+    if breaker is None:
+        breaker = _breakers[host] = CircuitBreaker(
+            UPSTREAM_BREAKER_THRESHOLD, UPSTREAM_BREAKER_BACKOFF, UPSTREAM_BREAKER_MAX_BACKOFF
+        )
+    return breaker
+
+
+class UpstreamClient:
+    """
+    A pooled async HTTP client for septa's servers.
+
+    Connections are kept alive between requests, and the number of requests in flight
+    to any single host is capped so one slow upstream can't take the whole pool. Each host
+    also has a circuit breaker, so requests to a host that is down fail fast.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport | None = None):
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(UPSTREAM_TIMEOUT, connect=UPSTREAM_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=UPSTREAM_MAX_CONNECTIONS,
+                max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE,
+                keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY,
+            ),
+            transport=transport,
+            follow_redirects=True,
+        )
+        self.host_limits: dict[str, asyncio.Semaphore] = {}
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        """
+        Sends a GET request to `url` through the shared pool.
+
+        Raises:
+            HTTPException: 503 if the upstream server could not be reached, timed out,
+                or has been failing and its circuit breaker is open. Also 503 if the request
+                ran out of time waiting for one of the host's UPSTREAM_MAX_PER_HOST slots, which
+                isn't held against the host's circuit breaker.
+        """
+        host = httpx.URL(url).host
+        breaker = get_breaker(host)
+        if not breaker.allow():
+            raise HTTPException(
+                status_code=503,
+                detail=f"{host} is unavailable, not retrying for another {breaker.retry_in():.0f}s",
+            )
+
+        semaphore = self.host_limits.setdefault(host, asyncio.Semaphore(UPSTREAM_MAX_PER_HOST))
+        with metrics.phase("upstream"):
+            try:
+                async with asyncio.timeout(UPSTREAM_DEADLINE):
+                    await semaphore.acquire()
+            except TimeoutError:
+                # Waiting on our own queue for the host says nothing about the host itself
+                breaker.trial_in_flight = False
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"Too many requests to {host} at once. The request to {url} timed out waiting its turn",
+                )
+            except BaseException:
+                breaker.trial_in_flight = False
+                raise
+
+            start = time.perf_counter()
+            try:
+                async with asyncio.timeout(UPSTREAM_DEADLINE):
+                    response = await self.client.get(url, **kwargs)
+            except (httpx.TransportError, TimeoutError) as err:
+                metrics.observe_upstream(host, type(err).__name__, time.perf_counter() - start)
+                breaker.record_failure()
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"Unable to reach {host}. The request to {url} failed with {type(err).__name__}",
+                )
+            except BaseException:
+                breaker.trial_in_flight = False
+                raise
+            finally:
+                semaphore.release()
+
+        metrics.observe_upstream(host, response.status_code, time.perf_counter() - start)
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+# Pooled connections belong to the event loop that opened them, so each loop gets its own client
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, UpstreamClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_client() -> UpstreamClient:
+    """
+    Returns the shared client for the running event loop, creating it on first use.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = UpstreamClient()
+    return client
+
+
+def install_client(client: UpstreamClient):
+    """
+    Makes `client` the shared client for the running event loop, e.g. one that replays recorded responses.
+    """
+    _clients[asyncio.get_running_loop()] = client
+
+
+async def close_client():
+    """
+    Closes the shared client for the running event loop, if one was created.
+    """
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def get(url: str, **kwargs) -> httpx.Response:
+    return await get_client().get(url, **kwargs)
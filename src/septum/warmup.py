@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import os
+
+import septum.scrapers as scrapers
+from septum.schedules import ScheduleGenerator
+
+logger = logging.getLogger(__name__)
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "false").lower() in ("1", "true", "yes")
+WARMUP_CONCURRENCY = int(os.getenv("WARMUP_CONCURRENCY", 8))
+WARMUP_INTERVAL = int(os.getenv("WARMUP_INTERVAL", 1800))
+# How often a worker that isn't leading checks whether the leader has warmed up yet
+WARMUP_FOLLOW_INTERVAL = int(os.getenv("WARMUP_FOLLOW_INTERVAL", 5))
+
+
+async def warm(
+    schedule: ScheduleGenerator, concurrency: int = WARMUP_CONCURRENCY, fresh: bool = True
+):
+    """
+    Fetches the stops and every stop's schedule for all lines into the generator's caches.
+
+    At most `concurrency` upstream requests are in flight at once. Anything that fails is logged
+    and left as it was in the cache, so a flaky upstream never wipes out warm data. Without
+    `fresh`, responses other workers already fetched are used instead of going to septa.
+
+    Feeds that haven't changed since they were last fetched keep what was parsed from them, and
+    only the results built from ones that did change are invalidated. With `fresh`, the scraped
+    pages are checked for changes too.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(refresh, *args):
+        async with semaphore:
+            return await refresh(*args)
+
+    lines = [line["line_code"] for line in schedule.LINES]
+    results = await asyncio.gather(
+        *(bounded(schedule.refresh_stops, line, fresh) for line in lines), return_exceptions=True
+    )
+
+    stops = []
+    for line, indexes in zip(lines, results):
+        if isinstance(indexes, Exception):
+            logger.warning("Unable to warm stops for %s: %r", line, indexes)
+            continue
+        # Both directions share the same stop IDs, and schedule.json covers both directions
+        stop_ids = {stop.stop_id for index in indexes.values() for stop in index.stations}
+        stops.extend((line, stop_id) for stop_id in stop_ids)
+
+    results = await asyncio.gather(
+        *(bounded(schedule.refresh_schedule, line, stop_id, fresh) for line, stop_id in stops),
+        return_exceptions=True,
+    )
+    failed = [stop for stop, result in zip(stops, results) if isinstance(result, Exception)]
+    if failed:
+        logger.warning("Unable to warm %d of %d stop schedules", len(failed), len(stops))
+
+    if fresh:
+        await scrapers.refresh_pages()
+
+
+async def run(schedule: ScheduleGenerator, interval: int = WARMUP_INTERVAL):
+    """
+    Warms the generator's caches right away and then again every `interval` seconds.
+
+    `interval` should stay below the cache TTLs so requests never see an expired entry.
+
+    With several workers sharing Redis, only the one holding the warm-up lease fetches from septa.
+    The rest wait until it has finished and then warm up from the responses it shared.
+    """
+    while True:
+        if await schedule.feeds.lead("warmup", ttl=interval * 2):
+            await warm(schedule)
+            await schedule.feeds.mark("warmup", ttl=interval * 2)
+        elif await schedule.feeds.marked("warmup"):
+            await warm(schedule, fresh=False)
+        else:
+            await asyncio.sleep(WARMUP_FOLLOW_INTERVAL)
+            continue
+        await asyncio.sleep(interval)
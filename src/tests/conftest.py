@@ -0,0 +1,56 @@
+"""
+Fixtures shared between the test modules
+"""
+
+# ruff: noqa: E402
+
+from collections.abc import Awaitable, Callable
+from unittest import mock
+
+import pytest
+
+# The endpoints are cached with fastapi-cache, which needs FastAPICache.init from the lifespan.
+# Tests don't run the lifespan, so the decorator is swapped out before any of them can import
+# septum.main, whichever module pytest collects first.
+mock.patch("fastapi_cache.decorator.cache", lambda *args, **kwargs: lambda f: f).start()
+
+from septum.records import Stop
+from septum.schedules import ScheduleColumns, ScheduleGenerator, StationIndex
+
+
+def numbered_stops(line: str) -> list[Stop]:
+    return [Stop(str(n), f"Stop {n}") for n in range(4)]
+
+
+async def no_trains(line: str, stop_id: str) -> list[dict]:
+    return []
+
+
+@pytest.fixture
+def stub_schedule(monkeypatch):
+    """
+    Makes ScheduleGenerators that answer from stubs instead of septa.
+
+    `stations(line)` gives a line's stops in inbound order, outbound runs the other way, and
+    `rows(line, stop_id)` gives a stop's schedule.json rows. By default every line has four stops,
+    "Stop 0" to "Stop 3", and no trains.
+    """
+
+    def make(
+        stations: Callable[[str], list[Stop]] = numbered_stops,
+        rows: Callable[[str, str], Awaitable[list[dict]]] = no_trains,
+    ) -> ScheduleGenerator:
+        schedule = ScheduleGenerator()
+
+        async def fetch_stops(line):
+            stops = stations(line)
+            return {0: StationIndex(stops), 1: StationIndex(stops[::-1])}
+
+        async def fetch_schedule(line, stop_id):
+            return ScheduleColumns(await rows(line, stop_id))
+
+        monkeypatch.setattr(schedule, "_fetch_stops", fetch_stops)
+        monkeypatch.setattr(schedule, "_fetch_schedule", fetch_schedule)
+        return schedule
+
+    return make
@@ -0,0 +1,44 @@
+"""
+A module to test the cache backend
+"""
+
+import asyncio
+
+import septum.backend as backend
+
+
+class TestTieredBackend:
+    """
+    A simple class for all the tests to live in
+    """
+
+    def test_large_values_are_compressed(self):
+        body = b'[{"station_name": "30th Street Station"}]' * 100
+        stored = backend.compress(body)
+
+        assert len(stored) < len(body)
+        assert backend.decompress(stored) == body
+        assert backend.compress(b"[]") == b"[]"
+        assert backend.decompress(b"[]") == b"[]"
+
+    def test_values_are_served_from_memory_without_redis(self):
+        # Nothing listens on port 1, so every Redis command fails
+        cache = backend.TieredBackend(backend.connect("redis://localhost:1"))
+
+        async def run():
+            assert await cache.get_with_ttl("fastapi-cache:stations") == (0, None)
+            await cache.set("fastapi-cache:stations", b"[]", expire=600)
+            ttl, value = await cache.get_with_ttl("fastapi-cache:stations")
+            assert value == b"[]"
+            assert 0 < ttl <= 600
+
+        asyncio.run(run())
+
+    def test_local_entries_expire_with_redis(self):
+        cache = backend.TieredBackend(backend.connect("redis://localhost:1"), local_ttl=60)
+
+        async def run():
+            await cache.set("fastapi-cache:stations", b"[]", expire=0)
+            assert await cache.get("fastapi-cache:stations") is None
+
+        asyncio.run(run())
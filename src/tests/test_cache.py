@@ -0,0 +1,85 @@
+"""
+A module to test the in-process TTL cache
+"""
+
+import asyncio
+
+import pytest
+
+from septum.cache import TTLCache
+
+
+class TestTTLCache:
+    """
+    A simple class for all the tests to live in
+    """
+
+    def test_entries_expire(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr("septum.cache.time.monotonic", lambda: now[0])
+        cache = TTLCache(ttl=10, maxsize=4)
+
+        cache.set("TRE", ["Trenton"])
+        assert cache.get("TRE") == ["Trenton"]
+        now[0] += 10
+        assert cache.get("TRE") is None
+
+    def test_least_recently_used_is_evicted(self):
+        cache = TTLCache(ttl=60, maxsize=2)
+        cache.set("AIR", 1)
+        cache.set("TRE", 2)
+        cache.get("AIR")
+        cache.set("WIL", 3)
+
+        assert cache.get("TRE") is None
+        assert cache.get("AIR") == 1
+        assert cache.get("WIL") == 3
+
+    def test_concurrent_misses_share_one_fetch(self):
+        cache = TTLCache(ttl=60, maxsize=4)
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return ["Trenton"]
+
+        async def run():
+            return await asyncio.gather(*(cache.get_or_fetch("TRE", fetch) for _ in range(5)))
+
+        assert asyncio.run(run()) == [["Trenton"]] * 5
+        assert len(calls) == 1
+        assert asyncio.run(cache.get_or_fetch("TRE", fetch)) == ["Trenton"]
+        assert len(calls) == 1
+
+    def test_failed_fetches_are_not_cached(self):
+        cache = TTLCache(ttl=60, maxsize=4)
+
+        async def fetch():
+            raise RuntimeError("upstream is down")
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(cache.get_or_fetch("TRE", fetch))
+        assert cache.get("TRE") is None
+        assert not cache.inflight
+
+    def test_stale_entries_are_served_while_refreshing(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr("septum.cache.time.monotonic", lambda: now[0])
+        cache = TTLCache(ttl=10, maxsize=4, stale_ttl=100)
+        cache.set("TRE", ["Trenton"])
+        now[0] += 50
+
+        async def fetch():
+            return ["Trenton", "Levittown"]
+
+        async def run():
+            stale = await cache.get_or_fetch("TRE", fetch)
+            await cache.inflight["TRE"]
+            return stale, await cache.get_or_fetch("TRE", fetch)
+
+        assert asyncio.run(run()) == (["Trenton"], ["Trenton", "Levittown"])
+
+        now[0] += 200
+        assert cache.get("TRE") is None
+        assert not cache.entries
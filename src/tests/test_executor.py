@@ -0,0 +1,76 @@
+"""
+A module to test running schedule work off the event loop
+"""
+
+import asyncio
+import json
+import pickle
+import threading
+
+import pytest
+
+import septum.executor as executor
+from septum.schedules import join_services, parse_schedule
+
+RAW_SCHEDULE = [
+    {
+        "block_id": block_id,
+        "service_id": service_id,
+        "direction_id": 0,
+        "release_name": "20240818",
+        "arrival_time": arrival_time,
+    }
+    for block_id, service_id, arrival_time in (
+        ("9200", "SID1", "07:00:00"),
+        ("9202", "SID1", "06:00:00"),
+        ("9300", "SID2", "08:00:00"),
+    )
+]
+
+
+class TestExecutor:
+    """
+    A simple class for all the tests to live in
+    """
+
+    def test_thread_mode_runs_off_the_event_loop(self):
+        executor.configure("thread", workers=1)
+        try:
+            loop_thread = threading.get_ident()
+            ran_in = asyncio.run(executor.run(threading.get_ident))
+            assert ran_in != loop_thread
+        finally:
+            executor.configure("inline")
+
+        assert asyncio.run(executor.run(threading.get_ident)) == threading.get_ident()
+
+    def test_unknown_modes_are_rejected(self):
+        with pytest.raises(ValueError):
+            executor.configure("fibers")
+
+    def test_process_mode_parses_like_inline(self):
+        body = json.dumps(RAW_SCHEDULE).encode()
+        inline = asyncio.run(executor.run(parse_schedule, body))
+
+        executor.configure("process", workers=1)
+        try:
+            columns = asyncio.run(executor.run(parse_schedule, body))
+        finally:
+            executor.configure("inline")
+
+        assert columns.recent == inline.recent
+        weekday, weekend = columns.classify_service_ids()
+        assert (weekday, weekend) == inline.classify_service_ids()
+        for service_ids in (weekday, weekend):
+            assert columns.most_recent(service_ids, 0) == inline.most_recent(service_ids, 0)
+
+    def test_parsed_schedules_survive_a_trip_to_another_process(self):
+        columns = pickle.loads(pickle.dumps(parse_schedule(json.dumps(RAW_SCHEDULE).encode())))
+
+        # Worked out while parsing, so nothing is left to compute on the event loop
+        assert columns.recent[(("SID1",), 0)] == [(21600, "9202"), (25200, "9200")]
+        weekday, weekend = columns.classify_service_ids()
+        assert columns.most_recent(weekend, 0) == [(28800, "9300")]
+        assert join_services(
+            (columns.most_recent(weekday, 0), []), (columns.most_recent(weekday, 0), [])
+        ) == ([(21600, 21600, "9202"), (25200, 25200, "9200")], [])
@@ -0,0 +1,133 @@
+"""
+A module to test the GTFS schedule backend
+"""
+
+import asyncio
+import zipfile
+from datetime import date
+
+import pytest
+
+from septum.enums import Direction
+from septum.gtfs import WEEKDAYS, WEEKEND, GTFSScheduleGenerator
+
+FEED = {
+    "stops.txt": """stop_id,stop_name,stop_lat,stop_lon
+90701,Trenton,40.2,-74.7
+90702,Levittown,40.1,-74.8
+90703,Torresdale,40.0,-74.9
+90704,Gray 30th St Station,39.9,-75.1
+""",
+    "trips.txt": """route_id,service_id,trip_id,trip_headsign,block_id,trip_short_name,direction_id
+TRE,M1,TRE_701,30th St,701,701,0
+TRE,M1,TRE_703,30th St,703,703,0
+TRE,M2,TRE_9701,30th St,9701,9701,0
+TRE,M1,TRE_700,Trenton,700,700,1
+AIR,M1,AIR_400,Airport,400,400,0
+""",
+    "stop_times.txt": """trip_id,arrival_time,departure_time,stop_id,stop_sequence
+TRE_701,06:00:00,06:00:00,90701,1
+TRE_701,06:10:00,06:10:00,90702,2
+TRE_701,06:20:00,06:20:00,90703,3
+TRE_701,06:50:00,06:50:00,90704,4
+TRE_703,05:00:00,05:00:00,90701,1
+TRE_703,05:45:00,05:45:00,90704,2
+TRE_9701,09:00:00,09:00:00,90701,1
+TRE_9701,09:20:00,09:20:00,90703,2
+TRE_9701,09:50:00,09:50:00,90704,3
+TRE_700,18:00:00,18:00:00,90704,1
+TRE_700,18:50:00,18:50:00,90701,2
+""",
+    "calendar.txt": """service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date
+M1,1,1,1,1,1,0,0,20240101,20991231
+M2,0,0,0,0,0,1,1,20240101,20991231
+""",
+}
+
+
+@pytest.fixture(scope="module")
+def schedule(tmp_path_factory):
+    path = tmp_path_factory.mktemp("gtfs") / "google_rail.zip"
+    with zipfile.ZipFile(path, "w") as feed:
+        for name, content in FEED.items():
+            feed.writestr(name, content)
+    return GTFSScheduleGenerator(str(path))
+
+
+class TestGTFSScheduleGenerator:
+    """
+    A simple class for all the tests to live in
+    """
+
+    def test_stations_are_in_travel_order(self, schedule):
+        stations = asyncio.run(schedule.get_stations_for_line("TRE", Direction.INBOUND))
+        assert [stop["stop_name"] for stop in stations] == [
+            "Trenton",
+            "Levittown",
+            "Torresdale",
+            "Gray 30th St Station",
+        ]
+
+    def test_schedule_for_station(self, schedule):
+        result = asyncio.run(schedule.get_schedule_for_station("TRE", "Trenton", Direction.INBOUND))
+        assert result == {
+            "weekday": [
+                {"train_id": "703", "departure_time": "05:00:00"},
+                {"train_id": "701", "departure_time": "06:00:00"},
+            ],
+            "weekend": [{"train_id": "9701", "departure_time": "09:00:00"}],
+        }
+
+    def test_schedule_for_line(self, schedule):
+        result = asyncio.run(
+            schedule.get_schedule_for_line(
+                "TRE", "Torresdale", "Gray 30th St Station", Direction.INBOUND
+            )
+        )
+        assert result == {
+            "weekday": [
+                {"train_id": "701", "departure_time": "06:20:00", "arrival_time": "06:50:00"}
+            ],
+            "weekend": [
+                {"train_id": "9701", "departure_time": "09:20:00", "arrival_time": "09:50:00"}
+            ],
+        }
+
+    def test_services_follow_the_day(self, schedule, monkeypatch):
+        calendar = [
+            {
+                **dict.fromkeys(WEEKDAYS + WEEKEND, "1"),
+                "service_id": service_id,
+                "start_date": start,
+                "end_date": end,
+            }
+            for service_id, start, end in (
+                ("FALL", "20240101", "20240831"),
+                ("WINTER", "20240901", "20241231"),
+            )
+        ]
+        monkeypatch.setattr(schedule.feed, "calendar", calendar)
+        monkeypatch.setattr(schedule.feed, "classified", {})
+
+        assert schedule.feed.service_ids(date(2024, 8, 31)) == (["FALL"], ["FALL"])
+        assert schedule.feed.service_ids(date(2024, 9, 1)) == (["WINTER"], ["WINTER"])
+
+    def test_next_departures_use_the_days_services(self, schedule, monkeypatch):
+        # Only M2's train runs past the end of M1's service period
+        calendar = [dict(service) for service in schedule.feed.calendar]
+        calendar[0]["end_date"] = "20240831"
+        calendar[1]["start_date"] = "20240901"
+        calendar[1]["monday"] = "1"
+        monkeypatch.setattr(schedule.feed, "calendar", calendar)
+        monkeypatch.setattr(schedule.feed, "classified", {})
+
+        def trains(day):
+            departures = asyncio.run(
+                schedule.get_next_departures(
+                    "TRE", "Trenton", "Gray 30th St Station", Direction.INBOUND, day, "00:00:00", 5
+                )
+            )
+            return [departure["train_id"] for departure in departures]
+
+        assert trains(date(2024, 8, 26)) == ["703", "701"]
+        assert trains(date(2024, 9, 2)) == ["9701"]
@@ -0,0 +1,80 @@
+"""
+A module to test fetching the schedule for a whole line at once
+"""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from septum.enums import Direction
+from septum.main import app
+from septum.models import get_schedule
+
+
+def line_schedule(stub_schedule, failing=()):
+    in_flight = {"now": 0, "max": 0}
+
+    async def rows(line, stop_id):
+        if stop_id in failing:
+            raise HTTPException(status_code=503, detail=f"Unable to fetch {stop_id}")
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        return [
+            {
+                "block_id": 9200,
+                "service_id": "SID1",
+                "direction_id": 0,
+                "release_name": "20240818",
+                "arrival_time": f"07:0{stop_id}:00",
+            }
+        ]
+
+    return stub_schedule(rows=rows), in_flight
+
+
+class TestLineSchedules:
+    """
+    A simple class for all the tests to live in
+    """
+
+    def test_every_stop_is_fetched_at_once(self, stub_schedule):
+        schedule, in_flight = line_schedule(stub_schedule)
+
+        async def run():
+            stops = await schedule.get_schedules_for_stations("TRE", Direction.INBOUND)
+            return [stop async for stop in stops]
+
+        stops = asyncio.run(run())
+        assert [stop["stop_name"] for stop in stops] == [f"Stop {n}" for n in range(4)]
+        assert stops[2]["weekday"] == [{"train_id": "9200", "departure_time": "07:02:00"}]
+        assert stops[2]["weekend"] == []
+        assert in_flight["max"] == 4
+
+    def test_requested_stops_keep_line_order(self, stub_schedule):
+        schedule, _ = line_schedule(stub_schedule)
+
+        async def run():
+            stops = await schedule.get_schedules_for_stations(
+                "TRE", Direction.OUTBOUND, ["Stop 1", "Stop 3"]
+            )
+            return [stop["stop_id"] async for stop in stops]
+
+        assert asyncio.run(run()) == ["3", "1"]
+
+    def test_one_failing_stop_fails_the_request(self, stub_schedule):
+        schedule, _ = line_schedule(stub_schedule, failing={"2"})
+
+        with pytest.raises(HTTPException):
+            asyncio.run(schedule.get_schedules_for_stations("TRE", Direction.INBOUND))
+
+        app.dependency_overrides[get_schedule] = lambda: schedule
+        try:
+            response = TestClient(app).get("/api/schedule/line", params={"line": "TRE"})
+        finally:
+            del app.dependency_overrides[get_schedule]
+        assert response.status_code == 503
+        assert response.json() == {"detail": "Unable to fetch 2"}
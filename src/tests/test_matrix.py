@@ -0,0 +1,106 @@
+"""
+A module to test the origin-destination trip matrices
+"""
+
+import asyncio
+import json
+
+import httpx
+
+import septum.upstream as upstream
+from septum.enums import Direction
+from septum.matrix import MatrixStore, TripMatrix
+from septum.records import Departure, Trip, parse_time
+from septum.schedules import ScheduleGenerator
+
+
+def trip(train_id, departure_time):
+    return Departure(parse_time(departure_time), train_id)
+
+
+class TestTripMatrix:
+    """
+    A simple class for all the tests to live in
+    """
+
+    stop_ids = ["90701", "90702", "90703"]
+    schedules = [
+        [trip("9200", "07:00:00"), trip("9202", "08:00:00")],
+        [trip("9200", "07:10:00"), trip("9201", "07:30:00"), trip("9202", "08:10:00")],
+        [trip("9200", "07:20:00"), trip("9201", "07:40:00")],
+    ]
+
+    def test_trips_stop_at_both_stations(self):
+        matrix = TripMatrix(self.stop_ids, self.schedules)
+
+        assert matrix.trips("90701", "90703") == [
+            Trip(parse_time("07:00:00"), parse_time("07:20:00"), "9200")
+        ]
+        assert [trip.train_id for trip in matrix.trips("90702", "90703")] == ["9200", "9201"]
+        assert [trip.to_dict() for trip in matrix.trips("90703", "90701")] == [
+            {"departure_time": "07:20:00", "arrival_time": "07:00:00", "train_id": "9200"}
+        ]
+
+    def test_store_stays_within_budget(self):
+        matrix = TripMatrix(self.stop_ids, self.schedules)
+        store = MatrixStore(budget=int(matrix.nbytes * 4.5))
+
+        store.set(("TRE", 0), (matrix, matrix), ttl=60)
+        store.set(("TRE", 1), (matrix, matrix), ttl=60)
+        store.get(("TRE", 0))
+        store.set(("AIR", 0), (matrix, matrix), ttl=60)
+
+        assert store.get(("TRE", 1)) is None
+        assert store.get(("TRE", 0)) is not None
+        assert store.nbytes == matrix.nbytes * 4
+
+        store.invalidate_line("TRE")
+        assert list(store.entries) == [("AIR", 0)]
+
+        long_line = TripMatrix([str(n) for n in range(300)], self.schedules * 100)
+        store.set(("WIL", 0), (long_line, long_line), ttl=60)
+        assert store.get(("WIL", 0)) is None
+
+    def test_matrices_expire_with_their_schedules(self, monkeypatch):
+        schedule = ScheduleGenerator()
+        schedule.matrices = MatrixStore()
+        schedule.schedules_cache.ttl = 0.05
+        schedule.schedules_cache.stale_ttl = 0
+        stops = [
+            {"stop_id": 90701, "stop_name": "Trenton", "direction_id": 0},
+            {"stop_id": 90702, "stop_name": "Levittown", "direction_id": 0},
+        ]
+        times = {"90701": "07:00:00", "90702": "07:10:00"}
+        fetched = []
+
+        async def get(url, **kwargs):
+            if url.endswith("stops.json"):
+                return httpx.Response(200, content=json.dumps(stops).encode())
+            stop_id = url.split("/")[-2]
+            fetched.append(stop_id)
+            row = {
+                "block_id": 9200,
+                "service_id": "SID1",
+                "direction_id": 0,
+                "release_name": "20240818",
+                "arrival_time": times[stop_id],
+            }
+            return httpx.Response(200, content=json.dumps([row]).encode())
+
+        monkeypatch.setattr(upstream, "get", get)
+
+        async def run():
+            trips = await schedule._get_trips("TRE", "Trenton", "Levittown", Direction.INBOUND)
+            cached = await schedule._get_trips("TRE", "Trenton", "Levittown", Direction.INBOUND)
+            fetches = len(fetched)
+            times["90701"] = "07:05:00"
+            await asyncio.sleep(0.1)
+            rebuilt = await schedule._get_trips("TRE", "Trenton", "Levittown", Direction.INBOUND)
+            return trips, cached, fetches, rebuilt
+
+        trips, cached, fetches, rebuilt = asyncio.run(run())
+        assert trips == cached
+        assert fetches == 2
+        assert len(fetched) == 4
+        assert [trip.to_dict()["departure_time"] for trip in trips[0]] == ["07:00:00"]
+        assert [trip.to_dict()["departure_time"] for trip in rebuilt[0]] == ["07:05:00"]
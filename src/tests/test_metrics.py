@@ -0,0 +1,59 @@
+"""
+A module to test request timing and metrics
+"""
+
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import septum.metrics as metrics
+
+
+def timed_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/slow/{name}")
+    async def slow(name: str):
+        with metrics.phase("upstream"):
+            await asyncio.sleep(0.01)
+        metrics.cache_result(hit=False)
+        return {"name": name}
+
+    return app
+
+
+class TestMetrics:
+    """
+    A simple class for all the tests to live in
+    """
+
+    def test_server_timing_header_lists_phases(self, monkeypatch):
+        monkeypatch.setattr(metrics, "SERVER_TIMING", True)
+        response = TestClient(timed_app()).get("/slow/trenton")
+
+        entries = dict(
+            entry.split(";", 1) for entry in response.headers["server-timing"].split(", ")
+        )
+        assert float(entries["upstream"].removeprefix("dur=")) >= 10
+        assert entries["cache"] == 'desc="miss"'
+        assert "total" in entries
+
+    def test_requests_are_labelled_by_route(self, monkeypatch):
+        monkeypatch.setattr(metrics, "METRICS_ENABLED", True)
+        client = TestClient(timed_app())
+        before = metrics.CACHE_REQUESTS.labels("/slow/{name}", "miss")._value.get()
+
+        client.get("/slow/trenton")
+        client.get("/slow/levittown")
+
+        content, _ = metrics.render()
+        assert b'route="/slow/{name}"' in content
+        assert b'route="/slow/trenton"' not in content
+        assert metrics.CACHE_REQUESTS.labels("/slow/{name}", "miss")._value.get() == before + 2
+
+    def test_phases_are_free_when_turned_off(self, monkeypatch):
+        monkeypatch.setattr(metrics, "METRICS_ENABLED", False)
+        monkeypatch.setattr(metrics, "SERVER_TIMING", False)
+        assert metrics.phase("upstream") is metrics.phase("processing")
@@ -0,0 +1,60 @@
+"""
+A module to test looking up the next departures from a station
+"""
+
+import asyncio
+from datetime import date, time
+
+from septum.enums import Direction
+from septum.models import NextDeparturesInput
+from septum.records import Stop
+
+
+def train(block_id, service_id, arrival_time):
+    return {
+        "block_id": block_id,
+        "service_id": service_id,
+        "direction_id": 0,
+        "release_name": "20240818",
+        "arrival_time": arrival_time,
+    }
+
+
+class TestNextDepartures:
+    """
+    A simple class for all the tests to live in
+    """
+
+    def next_departures(self, stub_schedule, day, after, count):
+        async def rows(line, stop_id):
+            weekday = [train(9200 + n, "SID1", f"{6 + n:02d}:00:00") for n in range(6)]
+            return weekday + [train(9300, "SID2", "09:30:00")]
+
+        schedule = stub_schedule(lambda line: [Stop("90701", "Trenton")], rows)
+        return asyncio.run(
+            schedule.get_next_departures(
+                "TRE", "Trenton", None, Direction.INBOUND, day, after, count
+            )
+        )
+
+    def test_weekday_departures_after_a_time(self, stub_schedule):
+        departures = self.next_departures(stub_schedule, date(2024, 8, 26), "08:00:00", 2)
+        assert departures == [
+            {"train_id": "9202", "departure_time": "08:00:00"},
+            {"train_id": "9203", "departure_time": "09:00:00"},
+        ]
+
+    def test_weekend_service_on_saturdays(self, stub_schedule):
+        departures = self.next_departures(stub_schedule, date(2024, 8, 24), "07:15:00", 5)
+        assert departures == [{"train_id": "9300", "departure_time": "09:30:00"}]
+
+    def test_nothing_left_today(self, stub_schedule):
+        assert self.next_departures(stub_schedule, date(2024, 8, 26), "23:00:00", 5) == []
+
+    def test_a_day_without_a_time_starts_at_midnight(self):
+        query = NextDeparturesInput(
+            line="TRE", direction=Direction.INBOUND, orig="Trenton", day=date(2024, 8, 24)
+        )
+        assert query.when() == (date(2024, 8, 24), "00:00:00")
+        query.after = time(17, 30)
+        assert query.when() == (date(2024, 8, 24), "17:30:00")
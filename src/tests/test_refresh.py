@@ -0,0 +1,131 @@
+"""
+A module to test refreshing feeds and pages only when they change
+"""
+
+import asyncio
+import json
+
+import httpx
+
+import septum.scrapers as scrapers
+import septum.upstream as upstream
+from septum.models import ScheduleMainOutput
+from septum.results import ResultCache
+from septum.schedules import ScheduleGenerator
+
+STOPS = [
+    {"stop_id": 1, "stop_name": "Trenton", "direction_id": 0},
+    {"stop_id": 2, "stop_name": "Torresdale", "direction_id": 0},
+]
+RESULT = {"weekday": [{"departure_time": "05:24:00", "train_id": "1000"}], "weekend": []}
+
+
+class TestRefresh:
+    """
+    A simple class for all the tests to live in
+    """
+
+    def test_unchanged_feeds_keep_the_cached_parse(self, monkeypatch):
+        schedule = ScheduleGenerator()
+        requests = []
+
+        async def get(url, **kwargs):
+            requests.append(kwargs.get("headers", {}))
+            if kwargs.get("headers", {}).get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            # Only the first response has an ETag, the others are compared by content
+            headers = {"ETag": '"v1"'} if len(requests) == 1 else {}
+            return httpx.Response(200, content=json.dumps(STOPS).encode(), headers=headers)
+
+        monkeypatch.setattr(upstream, "get", get)
+
+        async def run():
+            first = await schedule.refresh_stops("TRE")
+            not_modified = await schedule.refresh_stops("TRE")
+            schedule.validators.clear()
+            same_content = await schedule.refresh_stops("TRE")
+            return first, not_modified, same_content
+
+        first, not_modified, same_content = asyncio.run(run())
+        assert requests == [{}, {"If-None-Match": '"v1"'}, {}]
+        assert not_modified is first
+        assert same_content is first
+
+    def test_changed_stop_invalidates_only_its_results(self, monkeypatch):
+        schedule = ScheduleGenerator()
+        results = ResultCache()
+        row = {
+            "block_id": 9200,
+            "service_id": "SID1",
+            "direction_id": 0,
+            "release_name": "20240818",
+            "arrival_time": "05:15:00",
+        }
+        bodies = {"1": iter([b"[]", json.dumps([row]).encode()]), "2": iter([b"[]", b"[]"])}
+        notified = []
+        computed = []
+
+        async def get(url, **kwargs):
+            if url.endswith("stops.json"):
+                return httpx.Response(200, content=json.dumps(STOPS).encode())
+            return httpx.Response(200, content=next(bodies[url.split("/")[-2]]))
+
+        async def listener(line, stations):
+            notified.append((line, stations))
+
+        def compute(key):
+            async def compute():
+                computed.append(key)
+                return RESULT
+
+            return compute
+
+        monkeypatch.setattr(upstream, "get", get)
+        schedule.change_listeners.extend([listener, results.invalidate_line])
+
+        keys = [
+            ("TRE", "stations", "inbound"),
+            ("TRE", "schedule", "inbound", "Trenton", "Torresdale"),
+            ("TRE", "schedule", "inbound", "Torresdale", ""),
+        ]
+
+        async def run():
+            await schedule.refresh_stops("TRE")
+            for stop_id in ("1", "2"):
+                await schedule.refresh_schedule("TRE", stop_id)
+            for key in keys:
+                await results.respond("TRE", key, ScheduleMainOutput, compute(key))
+            for stop_id in ("1", "2"):
+                await schedule.refresh_schedule("TRE", stop_id)
+            for key in keys:
+                await results.respond("TRE", key, ScheduleMainOutput, compute(key))
+
+        asyncio.run(run())
+        assert notified == [("TRE", frozenset({"Trenton"}))]
+        assert computed == keys + [keys[1]]
+
+    def test_changed_pages_notify_listeners(self, monkeypatch):
+        header = "<tr><th>Station</th><th>Parameter</th></tr>"
+        trenton = "<tr><td>Trenton</td><td>Trenton</td></tr>"
+        pages = iter([f"<table>{header}{trenton}</table>"] * 2 + [f"<table>{header}</table>"])
+        changed = []
+
+        async def get(url, **kwargs):
+            return httpx.Response(200, text=next(pages))
+
+        async def listener(url):
+            changed.append(url)
+
+        monkeypatch.setattr(upstream, "get", get)
+        monkeypatch.setattr(scrapers, "_parsed_pages", {})
+        monkeypatch.setattr(scrapers, "_recent_pages", scrapers.TTLCache(ttl=60, maxsize=8))
+        monkeypatch.setattr(scrapers, "change_listeners", [listener])
+
+        async def run():
+            await scrapers.get_station_names()
+            # The routes page was never scraped, so it isn't fetched either
+            await scrapers.refresh_pages()
+            await scrapers.refresh_pages()
+
+        asyncio.run(run())
+        assert changed == [scrapers.STATION_NAMES_URL]
@@ -0,0 +1,110 @@
+"""
+A module to test the schedule result cache
+"""
+
+import asyncio
+
+import httpx
+
+import septum.upstream as upstream
+from septum.matrix import TripMatrix
+from septum.models import ScheduleMainOutput
+from septum.results import ResultCache
+from septum.schedules import ScheduleColumns, ScheduleGenerator
+
+RESULT = {"weekday": [{"departure_time": "05:24:00", "train_id": "1000"}], "weekend": []}
+
+
+class TestResultCache:
+    """
+    A simple class for all the tests to live in
+    """
+
+    def test_repeat_queries_are_served_from_cache(self):
+        results = ResultCache()
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            return RESULT
+
+        async def run():
+            key = ("TRE", "schedule", "inbound", "Torresdale", "")
+            first = await results.respond("TRE", key, ScheduleMainOutput, compute)
+            second = await results.respond("TRE", key, ScheduleMainOutput, compute)
+            await results.invalidate_line("TRE")
+            await results.respond("TRE", key, ScheduleMainOutput, compute)
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert first.body == second.body
+        assert ScheduleMainOutput.model_validate_json(first.body).model_dump() == RESULT
+        assert len(calls) == 2
+
+    def test_empty_results_are_not_cached(self):
+        results = ResultCache()
+        stored = []
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            return {"weekday": [], "weekend": []}
+
+        async def set_shared(line, key, body):
+            stored.append(key)
+
+        results._set_shared = set_shared
+
+        async def run():
+            key = ("TRE", "schedule", "inbound", "Torresdale", "")
+            first = await results.respond("TRE", key, ScheduleMainOutput, compute)
+            await results.respond("TRE", key, ScheduleMainOutput, compute)
+            return first
+
+        first = asyncio.run(run())
+        assert first.body == b'{"weekday":[],"weekend":[]}'
+        assert len(calls) == 2
+        assert stored == []
+
+    def test_upstream_changes_notify_listeners(self, monkeypatch):
+        schedule = ScheduleGenerator()
+        bodies = iter([b"[1]", b"[1]", b"[2]"])
+        changed = []
+
+        async def get(url, **kwargs):
+            return httpx.Response(200, content=next(bodies))
+
+        async def listener(line, stations):
+            changed.append((line, stations))
+
+        monkeypatch.setattr(upstream, "get", get)
+        schedule.change_listeners.append(listener)
+
+        async def run():
+            for _ in range(3):
+                await schedule._fetch_json("TRE", schedule.STOPS_URL.format("TRE"))
+
+        asyncio.run(run())
+        assert changed == [("TRE", None)]
+
+    def test_trusted_results_encode_like_the_response_model(self):
+        columns = ScheduleColumns(
+            [
+                {
+                    "block_id": 9200 + n,
+                    "service_id": "SID1",
+                    "direction_id": 0,
+                    "release_name": "20240818",
+                    "arrival_time": f"0{n}:15:00",
+                }
+                for n in range(5)
+            ]
+        )
+        departures = columns.most_recent(["SID1"], 0)
+        matrix = TripMatrix(["90701", "90702"], [departures, departures[2:]])
+        station = ScheduleGenerator._as_output(departures, [])
+        line = ScheduleGenerator._as_output(matrix.trips("90701", "90702"), [])
+
+        for result in (station, line):
+            fast = ResultCache().serialize(ScheduleMainOutput, result)
+            assert fast == ResultCache(validate=True).serialize(ScheduleMainOutput, result)
@@ -0,0 +1,84 @@
+"""
+A module to test the columnar schedule store
+"""
+
+from septum.records import Departure
+from septum.schedules import ScheduleColumns
+
+
+def train(block_id, service_id, direction_id, release_name, arrival_time):
+    return {
+        "block_id": block_id,
+        "service_id": service_id,
+        "direction_id": direction_id,
+        "release_name": release_name,
+        "arrival_time": arrival_time,
+    }
+
+
+class TestScheduleColumns:
+    """
+    A simple class for all the tests to live in
+    """
+
+    raw_schedule = [
+        train(9202, "SID1", 0, "20240101", "08:10:00"),
+        train(9202, "SID1", 0, "20240818", "08:05:00"),
+        train(9200, "SID1", 0, "20240818", "07:00:00"),
+        train(9201, "SID1", 1, "20240818", "07:30:00"),
+        train(9203, "SID2", 0, "20240818", "06:00:00"),
+    ]
+
+    def test_latest_release_per_train_sorted_by_departure(self):
+        columns = ScheduleColumns(self.raw_schedule)
+        assert columns.most_recent(["SID1"], 0) == [
+            Departure(7 * 3600, "9200"),
+            Departure(8 * 3600 + 5 * 60, "9202"),
+        ]
+
+    def test_multiple_service_ids(self):
+        columns = ScheduleColumns(self.raw_schedule)
+        assert [t.train_id for t in columns.most_recent(["SID1", "SID2"], 0)] == [
+            "9203",
+            "9200",
+            "9202",
+        ]
+
+    def test_empty_schedule(self):
+        assert ScheduleColumns([]).most_recent(["SID1"], 0) == []
+
+    def test_service_ids_are_classified_from_the_data(self):
+        columns = ScheduleColumns(
+            self.raw_schedule
+            + [
+                train(9204, "SID1", 0, "20240818", "09:00:00"),
+                train(9205, "SID3", 0, "20240818", "10:00:00"),
+                train(9206, "SID0", 0, "20240101", "11:00:00"),
+                train(9207, "SID0", 0, "20240101", "12:00:00"),
+                train(9208, "SID0", 0, "20240101", "13:00:00"),
+                train(9209, "SID0", 0, "20240101", "14:00:00"),
+            ]
+        )
+        assert columns.classify_service_ids() == (["SID1"], ["SID2", "SID3"])
+
+    def test_weekday_and_weekend_released_separately(self):
+        columns = ScheduleColumns(
+            [train(9200 + n, "SIDWK", 0, "20240818", f"{6 + n:02d}:00:00") for n in range(10)]
+            + [train(9300 + n, "SIDWE", 0, "20240901", f"{7 + n:02d}:30:00") for n in range(4)]
+        )
+        assert columns.classify_service_ids() == (["SIDWK"], ["SIDWE"])
+
+    def test_weekday_released_on_its_own_keeps_weekend(self):
+        columns = ScheduleColumns(
+            [train(9000 + n, "W1", 0, "20240101", "06:00:00") for n in range(100)]
+            + [train(8000 + n, "E1", 0, "20240101", "07:00:00") for n in range(40)]
+            + [train(9000 + n, "W2", 0, "20240301", "06:05:00") for n in range(100)]
+        )
+        assert columns.classify_service_ids() == (["W2"], ["E1"])
+
+    def test_ties_go_by_schedule_order(self):
+        columns = ScheduleColumns(
+            [train(9300, "SID9", 0, "20240818", "07:00:00")]
+            + [train(9200, "SID1", 0, "20240818", "06:00:00")]
+        )
+        assert columns.classify_service_ids() == (["SID9"], ["SID1"])
@@ -2,15 +2,10 @@
 A module to test the schedule endpoints
 """
 
-# ruff: noqa: E402
-
-from unittest import mock
-
 import pytest
 from fastapi.testclient import TestClient
 from pydantic import TypeAdapter
 
-mock.patch("fastapi_cache.decorator.cache", lambda *args, **kwargs: lambda f: f).start()
 from septum.main import app, schedule
 from septum.models import LinesOutput, ScheduleMainOutput, ScheduleStationOuput
 
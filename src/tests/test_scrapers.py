@@ -2,15 +2,14 @@
 A module to test the scraper endpoints
 """
 
-# ruff: noqa: E402
-
-from unittest import mock
+import asyncio
 
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 from pydantic import TypeAdapter
 
-mock.patch("fastapi_cache.decorator.cache", lambda *args, **kwargs: lambda f: f).start()
+import septum.scrapers as scrapers
 from septum.main import app
 from septum.models import BusAndTrolleyOutput, StationOutput
 
@@ -38,3 +37,48 @@ class TestReturnData:
         request = self.client.get(route)
         assert request.status_code == 200
         TypeAdapter(list[BusAndTrolleyOutput]).validate_json(request.content)
+
+
+class TestBusAndTrolleyPage:
+    """
+    Tests for the shared, conditionally requested bus and trolley page
+    """
+
+    PAGE = (
+        "<table><tr><th>#</th><th>Name</th></tr><tr><td>1</td><td> Parx Casino </td></tr></table>"
+        "<table><tr><th>#</th><th>Name</th></tr><tr><td>10</td><td>Lancaster</td></tr></table>"
+    )
+
+    def test_one_fetch_for_both_and_304_skips_parsing(self, monkeypatch):
+        requests = []
+
+        async def get(url, **kwargs):
+            requests.append(kwargs.get("headers", {}))
+            if kwargs.get("headers", {}).get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, text=self.PAGE, headers={"ETag": '"v1"'})
+
+        parses = []
+        parse_routes = scrapers._parse_bus_and_trolley_routes
+
+        def parse(content):
+            parses.append(1)
+            return parse_routes(content)
+
+        monkeypatch.setattr(scrapers.upstream, "get", get)
+        monkeypatch.setattr(scrapers, "_parse_bus_and_trolley_routes", parse)
+        monkeypatch.setattr(scrapers, "_parsed_pages", {})
+        monkeypatch.setattr(scrapers, "_recent_pages", scrapers.TTLCache(ttl=60, maxsize=8))
+
+        async def run():
+            bus, trolley = await asyncio.gather(
+                scrapers.get_bus_routes(), scrapers.get_trolley_routes()
+            )
+            scrapers._recent_pages.invalidate()
+            return bus, trolley, await scrapers.get_trolley_routes()
+
+        bus, trolley, revalidated = asyncio.run(run())
+        assert bus == [{"route_number": "1", "route_name": "Parx Casino"}]
+        assert trolley == revalidated == [{"route_number": "10", "route_name": "Lancaster"}]
+        assert requests == [{}, {"If-None-Match": '"v1"'}]
+        assert len(parses) == 1
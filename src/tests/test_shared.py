@@ -0,0 +1,95 @@
+"""
+A module to test sharing upstream responses between workers
+"""
+
+import asyncio
+
+import httpx
+
+import septum.upstream as upstream
+import septum.warmup as warmup
+from septum.schedules import ScheduleGenerator
+
+
+class FakeFeeds:
+    """
+    Stands in for another worker's responses in Redis
+    """
+
+    def __init__(self, leading: bool, bodies: dict[str, bytes] | None = None):
+        self.leading = leading
+        self.bodies = bodies or {}
+        self.marks: list[str] = []
+
+    async def get(self, url):
+        return self.bodies.get(url)
+
+    async def set(self, url, body):
+        self.bodies[url] = body
+
+    async def lead(self, name, ttl):
+        return self.leading
+
+    async def mark(self, name, ttl):
+        self.marks.append(name)
+
+    async def marked(self, name):
+        return name in self.marks
+
+
+class TestSharedFeeds:
+    """
+    A simple class for all the tests to live in
+    """
+
+    def test_shared_responses_are_used_instead_of_septa(self, monkeypatch):
+        schedule = ScheduleGenerator()
+        url = schedule.STOPS_URL.format("TRE")
+        schedule.feeds = FakeFeeds(leading=False, bodies={url: b'[{"stop_id": 1}]'})
+        fetched = []
+
+        async def get(url, **kwargs):
+            fetched.append(url)
+            return httpx.Response(
+                200, content=b'[{"stop_id": 2, "stop_name": "Trenton", "direction_id": 0}]'
+            )
+
+        monkeypatch.setattr(upstream, "get", get)
+
+        async def run():
+            assert await schedule._fetch_json("TRE", url) == [{"stop_id": 1}]
+            assert fetched == []
+            # Refreshing always goes to septa and shares what it got
+            await schedule.refresh_stops("TRE")
+            assert fetched == [url]
+            assert (
+                schedule.feeds.bodies[url]
+                == b'[{"stop_id": 2, "stop_name": "Trenton", "direction_id": 0}]'
+            )
+
+        asyncio.run(run())
+
+    def test_only_the_leader_warms_from_septa(self, monkeypatch):
+        warmed = []
+
+        async def warm(schedule, concurrency=warmup.WARMUP_CONCURRENCY, fresh=True):
+            warmed.append((schedule.feeds.leading, fresh))
+            raise asyncio.CancelledError
+
+        monkeypatch.setattr(warmup, "warm", warm)
+        monkeypatch.setattr(warmup, "WARMUP_FOLLOW_INTERVAL", 0)
+
+        async def run(schedule):
+            try:
+                await warmup.run(schedule)
+            except asyncio.CancelledError:
+                pass
+
+        leader, follower = ScheduleGenerator(), ScheduleGenerator()
+        leader.feeds = FakeFeeds(leading=True)
+        follower.feeds = FakeFeeds(leading=False)
+        follower.feeds.marks.append("warmup")
+        asyncio.run(run(leader))
+        asyncio.run(run(follower))
+
+        assert warmed == [(True, True), (False, False)]
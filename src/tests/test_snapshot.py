@@ -0,0 +1,83 @@
+"""
+A module to test saving and loading snapshots of parsed schedules
+"""
+
+import asyncio
+
+import septum.snapshot as snapshot
+from septum.enums import Direction
+from septum.records import Stop
+from septum.schedules import ScheduleGenerator
+
+
+def recording(stub_schedule, fetched: list) -> ScheduleGenerator:
+    def stations(line):
+        fetched.append(line)
+        return [Stop(str(n), f"Stop {n}") for n in range(3)]
+
+    async def rows(line, stop_id):
+        fetched.append((line, stop_id))
+        return [
+            {
+                "block_id": "9200",
+                "service_id": "SID1",
+                "direction_id": 0,
+                "release_name": "20240818",
+                "arrival_time": f"07:0{stop_id}:00",
+            }
+        ]
+
+    return stub_schedule(stations, rows)
+
+
+class TestSnapshot:
+    """
+    A simple class for all the tests to live in
+    """
+
+    def test_restarts_serve_from_the_snapshot(self, stub_schedule, tmp_path):
+        path = tmp_path / "septum.snapshot"
+        before, after = [], []
+        old = recording(stub_schedule, before)
+        new = recording(stub_schedule, after)
+
+        async def run():
+            expected = await old.get_schedule_for_station("TRE", "Stop 1", Direction.INBOUND)
+            old.digests["https://flat-api.septa.org/stops/TRE/stops.json"] = "abc"
+            await snapshot.save(old, path)
+
+            assert snapshot.load(new, path) == 2
+            assert await new.get_schedule_for_station("TRE", "Stop 1", Direction.INBOUND) == (
+                expected
+            )
+            assert new.digests == old.digests
+
+        asyncio.run(run())
+        assert after == []
+
+    def test_expired_entries_are_served_while_they_refresh(self, stub_schedule):
+        before, after = [], []
+        old = recording(stub_schedule, before)
+        new = recording(stub_schedule, after)
+
+        async def run():
+            await old.get_schedule_for_station("TRE", "Stop 1", Direction.INBOUND)
+            old.schedules_cache.set(("TRE", "1"), old.schedules_cache.get(("TRE", "1")), ttl=-5)
+            snapshot.loads(new, snapshot.dumps(old))
+
+            assert new.schedules_cache.get(("TRE", "1")) is None
+            result = await new.get_schedule_for_station("TRE", "Stop 1", Direction.INBOUND)
+            assert result["weekday"] == [{"departure_time": "07:01:00", "train_id": "9200"}]
+            await asyncio.sleep(0)
+
+        asyncio.run(run())
+        assert after == [("TRE", "1")]
+
+    def test_unusable_snapshots_are_ignored(self, tmp_path):
+        path = tmp_path / "septum.snapshot"
+        schedule = ScheduleGenerator()
+
+        assert snapshot.load(schedule, path) == 0
+        path.write_bytes(b"SEPTUM\x00\x00 from an older version")
+        assert snapshot.load(schedule, path) == 0
+        assert schedule.schedules_cache.entries == {}
@@ -0,0 +1,49 @@
+"""
+A module to test how the app starts up and shares its ScheduleGenerator
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+import septum
+from septum.main import app
+from septum.models import get_schedule
+
+
+class TestStartup:
+    """
+    A simple class for all the tests to live in
+    """
+
+    def test_html_parsers_are_imported_lazily(self):
+        check = "import sys, septum.main; print('bs4' in sys.modules)"
+        imported = subprocess.run(
+            [sys.executable, "-c", check],
+            cwd=Path(septum.__file__).parents[1],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        assert imported == "False"
+
+    def test_endpoints_and_validators_share_the_injected_schedule(self, stub_schedule):
+        schedule = stub_schedule()
+        app.dependency_overrides[get_schedule] = lambda: schedule
+        try:
+            client = TestClient(app)
+            response = client.get(
+                "/api/schedule/line",
+                params={"line": "TRE", "direction": "inbound", "stations": "Stop 1"},
+            )
+            assert [stop["stop_name"] for stop in response.json()] == ["Stop 1"]
+            assert (
+                client.get(
+                    "/api/schedule/line", params={"line": "TRE", "stations": "Trenton"}
+                ).status_code
+                == 400
+            )
+        finally:
+            app.dependency_overrides.clear()
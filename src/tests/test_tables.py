@@ -0,0 +1,42 @@
+"""
+A module to test the HTML table backends
+"""
+
+import pytest
+
+from septum.tables import BACKENDS, get_backend
+
+PAGE = b"""
+<html><body>
+<h1>Inputs</h1><!-- not a table -->
+<table>
+  <tr><th>Route</th><th>Name</th></tr>
+  <tr><td> 1 </td><td><font><a href="#">Parx Casino</a> &amp; Frankford&nbsp;</font></td></tr>
+  <tr><td>G1</td><td>Overbrook<br>Loop</td></tr>
+</table>
+<p>between</p>
+<table><tr><th>Route</th></tr><tr><td>10</td><td>Lancaster</td></tr></table>
+</body></html>
+"""
+
+
+@pytest.mark.parametrize("name", list(BACKENDS))
+def test_backends_agree_with_soup(name):
+    try:
+        backend = get_backend(name)
+    except ImportError:
+        pytest.skip(f"{name} is not installed")
+
+    assert backend(PAGE) == BACKENDS["soup"](PAGE)
+
+
+def test_soup_tables_shape():
+    assert BACKENDS["soup"](PAGE) == [
+        [[], [" 1 ", "Parx Casino & Frankford\xa0"], ["G1", "OverbrookLoop"]],
+        [[], ["10", "Lancaster"]],
+    ]
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_backend("regex")
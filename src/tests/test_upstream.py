@@ -0,0 +1,119 @@
+"""
+A module to test the shared upstream client
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+import septum.upstream as upstream
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    monkeypatch.setattr(upstream, "_breakers", {})
+
+
+class TestUpstreamClient:
+    """
+    A simple class for all the tests to live in
+    """
+
+    def test_unreachable_host_is_a_503(self):
+        def handler(request):
+            raise httpx.ConnectError("connection refused", request=request)
+
+        async def run():
+            client = upstream.UpstreamClient(transport=httpx.MockTransport(handler))
+            try:
+                await client.get("https://flat-api.septa.org/stops/TRE/stops.json")
+            finally:
+                await client.aclose()
+
+        with pytest.raises(HTTPException) as err:
+            asyncio.run(run())
+        assert err.value.status_code == 503
+
+    def test_requests_per_host_are_capped(self, monkeypatch):
+        monkeypatch.setattr(upstream, "UPSTREAM_MAX_PER_HOST", 2)
+        in_flight = {"now": 0, "max": 0}
+
+        async def handler(request):
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            await asyncio.sleep(0.01)
+            in_flight["now"] -= 1
+            return httpx.Response(200, json=[])
+
+        async def run():
+            client = upstream.UpstreamClient(transport=httpx.MockTransport(handler))
+            await asyncio.gather(
+                *(client.get(f"https://flat-api.septa.org/stops/{i}.json") for i in range(6))
+            )
+            await client.aclose()
+
+        asyncio.run(run())
+        assert in_flight["max"] == 2
+
+    def test_queueing_for_a_slot_does_not_trip_the_breaker(self, monkeypatch):
+        monkeypatch.setattr(upstream, "UPSTREAM_MAX_PER_HOST", 1)
+        monkeypatch.setattr(upstream, "UPSTREAM_DEADLINE", 0.05)
+        monkeypatch.setattr(upstream, "UPSTREAM_BREAKER_THRESHOLD", 1)
+
+        async def handler(request):
+            await asyncio.sleep(0.03)
+            return httpx.Response(200, json=[])
+
+        async def run():
+            client = upstream.UpstreamClient(transport=httpx.MockTransport(handler))
+            results = await asyncio.gather(
+                *(client.get(f"https://flat-api.septa.org/stops/{i}.json") for i in range(4)),
+                return_exceptions=True,
+            )
+            await client.aclose()
+            return results
+
+        results = asyncio.run(run())
+        assert results[0].status_code == 200
+        assert any(isinstance(result, HTTPException) for result in results)
+        assert upstream.get_breaker("flat-api.septa.org").allow()
+
+    def test_one_client_per_event_loop(self):
+        async def run():
+            client = upstream.get_client()
+            assert upstream.get_client() is client
+            await upstream.close_client()
+            return client
+
+        assert asyncio.run(run()) is not asyncio.run(run())
+
+    def test_breaker_opens_and_lets_a_trial_through_after_backoff(self, monkeypatch):
+        monkeypatch.setattr(upstream, "UPSTREAM_BREAKER_THRESHOLD", 2)
+        now = [1000.0]
+        monkeypatch.setattr(upstream.time, "monotonic", lambda: now[0])
+        statuses = iter([500, 502, 200])
+        sent = []
+
+        def handler(request):
+            sent.append(request.url)
+            return httpx.Response(next(statuses))
+
+        async def run():
+            client = upstream.UpstreamClient(transport=httpx.MockTransport(handler))
+            url = "https://www3.septa.org/VIRegionalRail.html"
+            codes = [(await client.get(url)).status_code for _ in range(2)]
+
+            with pytest.raises(HTTPException) as err:
+                await client.get(url)
+            assert err.value.status_code == 503
+            assert len(sent) == 2
+
+            now[0] += upstream.UPSTREAM_BREAKER_BACKOFF
+            codes.append((await client.get(url)).status_code)
+            await client.aclose()
+            return codes
+
+        assert asyncio.run(run()) == [500, 502, 200]
+        assert upstream.get_breaker("www3.septa.org").failures == 0
@@ -0,0 +1,35 @@
+"""
+A module to test the startup warm-up
+"""
+
+import asyncio
+
+import septum.warmup as warmup
+from septum.records import Stop
+
+
+class TestWarmup:
+    """
+    A simple class for all the tests to live in
+    """
+
+    def test_warm_fills_every_line(self, stub_schedule):
+        fetched = []
+
+        def stations(line):
+            return [Stop(f"{line}-{n}", f"Stop {n}") for n in range(3)]
+
+        async def rows(line, stop_id):
+            if line == "TRE":
+                raise RuntimeError("upstream is down")
+            fetched.append((line, stop_id))
+            return []
+
+        schedule = stub_schedule(stations, rows)
+
+        asyncio.run(warmup.warm(schedule, concurrency=2))
+
+        assert all(schedule.stops_cache.get(line) for line in schedule.LINE_CODES)
+        assert len(fetched) == 3 * (len(schedule.LINES) - 1)
+        assert schedule.schedules_cache.get(("AIR", "AIR-0")) is not None
+        assert schedule.schedules_cache.get(("TRE", "TRE-0")) is None